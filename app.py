@@ -3,35 +3,97 @@ from flask_cors import CORS
 from controllers.product_controller import product_bp
 from controllers.cart_controller import cart_bp
 from controllers.user_controller import auth_bp
-from models.database import db
-from repositories.product_repository import ProductRepository
+from controllers.order_controller import order_bp
+from models.database import configure_engine, db, engine_options, pool_capacity, pool_stats
+from repositories.product_repository import product_cache
+from utils.admission import admission_controller, admit_request, release_request
+from utils.instrumentation import init_request_timing, instrument_engine
+from utils.passwords import password_hasher
+from utils.rate_limit import parse_limits, rate_limiter
+from utils.serialization import FragmentJSONProvider, product_fragments
+from utils.tokens import authenticate_request, parse_keys, token_manager
+from bootstrap import bootstrap_app, bootstrap_command
+from commands import grant_admin_command, import_products_command, release_reservations_command
 import os
 
 def create_app():
     """Application factory pattern for creating Flask app."""
     app = Flask(__name__)
+    app.json = FragmentJSONProvider(app)
     
     # Configuration
-    app.config['DEBUG'] = True
+    app.config['DEBUG'] = os.environ.get('SERVER_MODE', 'development') == 'development'
     app.config['JSON_SORT_KEYS'] = False
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], os.environ)
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'a_default_secret_key')
+    app.config['JWT_KEYS'] = parse_keys(os.environ.get('JWT_KEYS'), app.config['SECRET_KEY'])
+    app.config['TOKEN_CACHE_SIZE'] = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+    app.config['PRODUCT_CACHE_SIZE'] = int(os.environ.get('PRODUCT_CACHE_SIZE', 1024))
+    # Per worker: bounds how long other workers may serve a product after a write
+    app.config['PRODUCT_CACHE_TTL'] = float(os.environ.get('PRODUCT_CACHE_TTL', 5))
+    app.config['CHECKOUT_RESERVATION_TTL'] = int(os.environ.get('CHECKOUT_RESERVATION_TTL', 900))
+    app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+    app.config['RATE_LIMITS'] = parse_limits(os.environ.get('RATE_LIMITS'))
+    app.config['RATE_LIMIT_STORE'] = os.environ.get('RATE_LIMIT_STORE')
+    app.config['ADMISSION_MAX_CONCURRENCY'] = int(os.environ.get(
+        'ADMISSION_MAX_CONCURRENCY', pool_capacity(app.config['SQLALCHEMY_ENGINE_OPTIONS'])))
+    app.config['ADMISSION_QUEUE_TIMEOUT'] = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 0.1))
+    app.config['REQUEST_TIMING'] = os.environ.get('REQUEST_TIMING', '1') == '1'
+    app.config['SLOW_REQUEST_MS'] = float(os.environ.get('SLOW_REQUEST_MS', 500))
+    app.config['BCRYPT_ROUNDS'] = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
     
-    # Initialize database
-    db.init_app(app)
+    # Size the process-wide product cache (0 disables it)
+    product_cache.configure(max_size=app.config['PRODUCT_CACHE_SIZE'], ttl=app.config['PRODUCT_CACHE_TTL'])
+    
+    # Bearer tokens: signing/verification keys and the verified-token cache
+    token_manager.configure(keys=app.config['JWT_KEYS'], cache_size=app.config['TOKEN_CACHE_SIZE'])
+    
+    # Per-client token buckets for search, validate/checkout and auth, shared by all workers
+    rate_limiter.configure(limits=app.config['RATE_LIMITS'], path=app.config['RATE_LIMIT_STORE'],
+                           enabled=app.config['RATE_LIMIT_ENABLED'])
+    
+    # Shed requests with 503 rather than queue them for a pool connection
+    admission_controller.configure(limit=app.config['ADMISSION_MAX_CONCURRENCY'],
+                                   wait=app.config['ADMISSION_QUEUE_TIMEOUT'])
     
+    # Bound concurrent bcrypt work so logins cannot starve other requests
+    password_hasher.configure(rounds=app.config['BCRYPT_ROUNDS'],
+                              workers=app.config['PASSWORD_HASH_WORKERS'],
+                              queue_size=app.config['PASSWORD_HASH_QUEUE'])
+    
+    # Initialize database (no I/O here; schema and seed data come from `bootstrap`)
+    db.init_app(app)
     with app.app_context():
-        db.create_all()
-        ProductRepository().populate_db()
+        configure_engine(db.engine, os.environ)
+        if app.config['REQUEST_TIMING']:
+            instrument_engine(db.engine)
+    app.cli.add_command(bootstrap_command)
+    app.cli.add_command(release_reservations_command)
+    app.cli.add_command(import_products_command)
+    app.cli.add_command(grant_admin_command)
+    
+    # Enable CORS for all routes; expose validators for conditional requests
+    CORS(app, expose_headers=['ETag', 'Last-Modified', 'WWW-Authenticate', 'Retry-After', 'Server-Timing'])
     
-    # Enable CORS for all routes
-    CORS(app)
+    # Per-request SQL/phase timings, Server-Timing header and slow-request log
+    if app.config['REQUEST_TIMING']:
+        init_request_timing(app, app.config['SLOW_REQUEST_MS'])
+    
+    # Admission first so shed requests cost nothing; then verify bearer tokens
+    # (sets g.current_user_id, which also keys the rate limiter)
+    app.before_request(admit_request)
+    app.teardown_request(release_request)
+    app.before_request(authenticate_request)
     
     # Register blueprints
     app.register_blueprint(product_bp)
     app.register_blueprint(cart_bp)
     app.register_blueprint(auth_bp)
+    app.register_blueprint(order_bp)
     
     # Root endpoint
     @app.route('/')
@@ -45,21 +107,33 @@ def create_app():
                     'get_detail': 'GET /api/products/<id>',
                     'check_availability': 'GET /api/products/<id>/availability',
                     'get_categories': 'GET /api/products/categories',
-                    'search': 'GET /api/products/search'
+                    'search': 'GET /api/products/search',
+                    'import': 'POST /api/products/import',
+                    'export': 'GET /api/products/export',
+                    'sync': 'POST /api/products/sync'
                 },
                 'cart': {
                     'create_or_get': 'POST /api/cart',
                     'get_cart': 'GET /api/cart/<cart_id>',
                     'add_item': 'POST /api/cart/<cart_id>/items',
+                    'batch_items': 'POST /api/cart/<cart_id>/items:batch',
                     'update_item': 'PUT /api/cart/<cart_id>/items/<product_id>',
                     'remove_item': 'DELETE /api/cart/<cart_id>/items/<product_id>',
                     'clear_cart': 'POST /api/cart/<cart_id>/clear',
-                    'validate_cart': 'GET /api/cart/<cart_id>/validate'
+                    'validate_cart': 'GET /api/cart/<cart_id>/validate',
+                    'validate_carts': 'POST /api/cart/validate',
+                    'checkout': 'POST /api/cart/<cart_id>/checkout'
+                },
+                'orders': {
+                    'get_order': 'GET /api/orders/<order_id>',
+                    'confirm': 'POST /api/orders/<order_id>/confirm',
+                    'cancel': 'POST /api/orders/<order_id>/cancel'
                 },
                 'auth': {
                     'signup': 'POST /api/auth/signup',
                     'login': 'POST /api/auth/login'
-                }
+                },
+                'metrics': 'GET /metrics'
             }
         })
     
@@ -71,6 +145,18 @@ def create_app():
             'message': 'API is running successfully'
         })
     
+    # Runtime metrics endpoint
+    @app.route('/metrics')
+    def metrics():
+        return jsonify({
+            'product_cache': product_cache.stats(),
+            'product_fragments': product_fragments.stats(),
+            'password_hasher': password_hasher.stats(),
+            'token_cache': token_manager.cache.stats(),
+            'admission': admission_controller.stats(),
+            'db_pool': pool_stats(db.engine)
+        })
+    
     # Global error handlers
     @app.errorhandler(404)
     def not_found(error):
@@ -96,5 +182,11 @@ def create_app():
     return app
 
 if __name__ == '__main__':
+    # Bootstrap once here instead of in every worker
+    if os.environ.get('BOOTSTRAP_ON_START', '1') == '1':
+        bootstrap_app(create_app())
+    if os.environ.get('SERVER_MODE', 'development') == 'production':
+        # Hand the process over to Gunicorn (settings in gunicorn.conf.py)
+        os.execvp('gunicorn', ['gunicorn', '--config', 'gunicorn.conf.py', 'wsgi:app'])
     app = create_app()
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=True)
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""Regression check: reading a cart must not cost more SQL as it grows.
+
+Creates carts with 1, 10 and 100 lines in a throwaway SQLite database, then
+counts the statements GET /api/cart/<cart_id> issues for each one. The count
+must be the same at every size; a lazy load per line (N+1) makes it grow.
+Prints one JSON object per cart size and exits non-zero on a regression.
+
+Usage:
+    python -m benchmarks.cart_query_count
+    python -m benchmarks.cart_query_count --sizes 1 40 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import uuid
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event  # noqa: E402
+from app import create_app  # noqa: E402
+from models.cart import Cart, CartItem  # noqa: E402
+from models.database import db  # noqa: E402
+from models.product import Product  # noqa: E402
+
+
+def make_cart(product_ids) -> str:
+    cart_id = str(uuid.uuid4())
+    db.session.add(Cart(id=cart_id))
+    db.session.add_all(CartItem(cart_id=cart_id, product_id=product_id, quantity=1)
+                       for product_id in product_ids)
+    db.session.commit()
+    return cart_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100],
+                        help='Cart sizes (number of lines) to compare.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DATABASE_URL'] = f'sqlite:///{directory}/cart_queries.db'
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            products = [
+                Product(name=f'Product {index}', description='Query count check', price=Decimal('1.00'),
+                        stock=1000, category='Benchmark')
+                for index in range(max(args.sizes))
+            ]
+            db.session.add_all(products)
+            db.session.commit()
+            product_ids = [product.id for product in products]
+            carts = {size: make_cart(product_ids[:size]) for size in args.sizes}
+            engine = db.engine
+            db.session.remove()
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        client = app.test_client()
+        counts = {}
+        errors = 0
+        for size, cart_id in carts.items():
+            statements.clear()
+            event.listen(engine, 'before_cursor_execute', count)
+            try:
+                response = client.get(f'/api/cart/{cart_id}')
+            finally:
+                event.remove(engine, 'before_cursor_execute', count)
+            counts[size] = len(statements)
+            errors += response.status_code != 200
+            print(json.dumps({'items': size, 'status': response.status_code, 'statements': counts[size]}))
+
+    if errors:
+        print(f'{errors} cart request(s) failed', file=sys.stderr)
+        sys.exit(1)
+    if len(set(counts.values())) > 1:
+        print(f'GET /api/cart/<cart_id> statements grow with cart size: {counts}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Multi-threaded check that concurrent adds of one product to one cart lose nothing.
+
+Threads add one unit of the same product to the same cart `--adds` times
+each; afterwards the cart must hold exactly one line with threads * adds
+units. `--strategy upsert` posts to POST /api/cart/<cart_id>/items through
+a Flask test client per thread, so every add runs the full request path down
+to the INSERT ... ON CONFLICT DO UPDATE in CartRepository.add_item_to_cart;
+`--strategy read-modify-write` replays the old SELECT-then-increment-or-INSERT
+pattern for comparison. Prints one JSON object per strategy and exits
+non-zero if the upsert strategy lost an increment, created a duplicate line
+or got a non-200 response.
+
+Usage:
+    python -m benchmarks.cart_upsert_concurrency --threads 16 --adds 50
+    DATABASE_URL=postgresql://... python -m benchmarks.cart_upsert_concurrency
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['RATE_LIMIT_ENABLED'] = '0'
+os.environ.setdefault('SLOW_REQUEST_MS', '60000')  # lock waits are expected here
+
+from app import create_app  # noqa: E402
+from bootstrap import bootstrap_app  # noqa: E402
+from models.cart import CartItem  # noqa: E402
+from models.database import db  # noqa: E402
+from models.product import Product  # noqa: E402
+from repositories.cart_repository import CartRepository  # noqa: E402
+
+
+def read_modify_write(cart_id: str, product_id: int) -> bool:
+    # populate_existing stands in for the fresh session each request gets
+    item = CartItem.query.filter_by(cart_id=cart_id, product_id=product_id).populate_existing().first()
+    if item:
+        item.quantity += 1
+    else:
+        db.session.add(CartItem(cart_id=cart_id, product_id=product_id, quantity=1))
+    db.session.commit()
+    return True
+
+
+def run(app, strategy: str, threads: int, adds: int):
+    with app.app_context():
+        # Enough stock for every add: the endpoint refuses to exceed it
+        product = Product(name='Hot SKU', description='Stress test product', price=Decimal('1.00'),
+                          stock=threads * adds, category='Benchmark')
+        db.session.add(product)
+        cart = CartRepository().create_cart()
+        db.session.commit()
+        product_id, cart_id = product.id, cart.id
+
+    errors = [0]
+    lock = threading.Lock()
+
+    def shopper():
+        local_errors = 0
+        if strategy == 'upsert':
+            client = app.test_client()
+            for _ in range(adds):
+                response = client.post(f'/api/cart/{cart_id}/items',
+                                       json={'product_id': product_id, 'quantity': 1})
+                local_errors += response.status_code != 200
+        else:
+            with app.app_context():
+                for _ in range(adds):
+                    try:
+                        read_modify_write(cart_id, product_id)
+                    except Exception:
+                        db.session.rollback()
+                        local_errors += 1
+                db.session.remove()
+        with lock:
+            errors[0] += local_errors
+
+    workers = [threading.Thread(target=shopper) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        lines = CartItem.query.filter_by(cart_id=cart_id, product_id=product_id).all()
+        quantity = sum(line.quantity for line in lines)
+    expected = threads * adds
+    return {
+        'strategy': strategy,
+        'threads': threads,
+        'adds_per_thread': adds,
+        'expected_quantity': expected,
+        'final_quantity': quantity,
+        'lost_increments': expected - quantity,
+        'lines': len(lines),
+        'errors': errors[0],
+        'elapsed_s': round(elapsed, 3),
+        'throughput_ops': round((expected - errors[0]) / elapsed, 1) if elapsed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--adds', type=int, default=50)
+    parser.add_argument('--strategy', choices=['upsert', 'read-modify-write', 'both'], default='both')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if not os.environ.get('DATABASE_URL'):
+            os.environ['DATABASE_URL'] = f'sqlite:///{directory}/cart.db?timeout=30'
+        app = create_app()
+        bootstrap_app(app, seed=False)
+
+        strategies = ['upsert', 'read-modify-write'] if args.strategy == 'both' else [args.strategy]
+        results = [run(app, strategy, args.threads, args.adds) for strategy in strategies]
+        for result in results:
+            print(json.dumps(result))
+
+    if any(result['strategy'] == 'upsert' and (result['lost_increments'] or result['lines'] != 1 or result['errors'])
+           for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
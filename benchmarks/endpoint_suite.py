@@ -0,0 +1,238 @@
+"""Endpoint benchmark suite over a large synthetic dataset.
+
+Bulk-generates a catalog, carts and cart lines (Core executemany in chunks,
+deterministic for a given `--seed`), then drives timed scenarios through
+`create_app` in-process with the Flask test client. Prints one JSON object
+describing the run and dataset, then one per scenario with throughput and
+p50/p95/p99 latency, tagged with the current commit so runs can be diffed.
+
+Seeding a million cart lines takes a while; pass `--database` to keep the
+seeded SQLite file and reuse it on later runs (it is only seeded when empty).
+
+Usage:
+    python -m benchmarks.endpoint_suite --products 100000 --carts 50000 --cart-items 1000000
+    python -m benchmarks.endpoint_suite --database /tmp/bench.db --scenarios product_detail search
+    python -m benchmarks.endpoint_suite --products 5000 --carts 1000 --cart-items 20000 --duration 2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['RATE_LIMIT_ENABLED'] = '0'
+os.environ.setdefault('SLOW_REQUEST_MS', '60000')  # keep stderr quiet on whole-catalog scenarios
+
+from sqlalchemy import func, select, text  # noqa: E402
+from app import create_app  # noqa: E402
+from benchmarks.serve_throughput import percentile  # noqa: E402
+from bootstrap import bootstrap_app  # noqa: E402
+from models.cart import Cart, CartItem  # noqa: E402
+from models.database import db  # noqa: E402
+from models.product import Product  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CATEGORIES = ['Electronics', 'Home & Kitchen', 'Sports', 'Books', 'Toys',
+              'Garden', 'Beauty', 'Automotive', 'Music', 'Office']
+# Description vocabulary; search scenarios query these words
+WORDS = ['wireless', 'premium', 'compact', 'organic', 'portable', 'classic', 'steel', 'cotton',
+         'digital', 'ergonomic', 'vintage', 'outdoor', 'smart', 'handmade', 'waterproof', 'travel']
+CHUNK = 10000
+
+
+def chunks(rows, size=CHUNK):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def seed(products: int, carts: int, cart_items: int, rng: random.Random) -> None:
+    """Bulk-insert the dataset with one executemany per chunk; memory stays at one chunk."""
+    now = datetime.utcnow()
+    connection = db.session.connection()
+
+    def product_rows():
+        for index in range(products):
+            words = ' '.join(rng.sample(WORDS, 3))
+            yield {
+                'name': f'{words.split()[0].title()} product {index}',
+                'description': f'{words} item number {index}',
+                'price': Decimal(rng.randint(100, 100000)) / 100,
+                'stock': rng.randint(0, 500),
+                'category': CATEGORIES[index % len(CATEGORIES)],
+                'image_url': None,
+                'is_active': rng.random() > 0.05,
+                'version': 1,
+                'updated_at': now,
+            }
+
+    for chunk in chunks(product_rows()):
+        connection.execute(Product.__table__.insert(), chunk)
+
+    cart_ids = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(carts)]
+    for chunk in chunks({'id': cart_id, 'user_id': None, 'version': 1, 'updated_at': now}
+                        for cart_id in cart_ids):
+        connection.execute(Cart.__table__.insert(), chunk)
+
+    def item_rows():
+        per_cart, extra = divmod(cart_items, carts) if carts else (0, 0)
+        for index, cart_id in enumerate(cart_ids):
+            count = min(per_cart + (index < extra), products)
+            for product_id in rng.sample(range(1, products + 1), count):
+                yield {'cart_id': cart_id, 'product_id': product_id, 'quantity': rng.randint(1, 3)}
+
+    for chunk in chunks(item_rows()):
+        connection.execute(CartItem.__table__.insert(), chunk)
+    db.session.commit()
+    if db.engine.dialect.name in ('sqlite', 'postgresql'):
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+
+
+def scenarios(product_ids, cart_ids):
+    """name -> callable(rng) returning (method, path, json body or None).
+
+    `product_ids` are active, in-stock products, so detail and add-to-cart
+    requests measure the success path rather than 404s and stock errors.
+    """
+    def random_product(rng):
+        return rng.choice(product_ids)
+
+    return {
+        'product_detail': lambda rng: ('GET', f'/api/products/{random_product(rng)}', None),
+        'product_availability': lambda rng: (
+            'GET', f'/api/products/{random_product(rng)}/availability?quantity=2', None),
+        'products_page': lambda rng: (
+            'GET', f'/api/products?limit=20&offset={rng.randint(0, max(len(product_ids) - 20, 0))}', None),
+        'products_category_page': lambda rng: (
+            'GET', f'/api/products?category={rng.choice(CATEGORIES)}&limit=20', None),
+        'products_cursor': lambda rng: ('GET', '/api/products?cursor=&limit=20', None),
+        'products_all': lambda rng: ('GET', '/api/products', None),
+        'products_stream': lambda rng: ('GET', '/api/products?stream=1', None),
+        'products_export': lambda rng: ('GET', '/api/products/export', None),
+        'categories': lambda rng: ('GET', '/api/products/categories', None),
+        'search': lambda rng: ('GET', f'/api/products/search?q={rng.choice(WORDS)}&limit=20', None),
+        'listing_search': lambda rng: (
+            'GET', f'/api/products?search={"+".join(rng.sample(WORDS, 2))}&limit=20', None),
+        'cart_get': lambda rng: ('GET', f'/api/cart/{rng.choice(cart_ids)}', None),
+        'cart_validate': lambda rng: ('GET', f'/api/cart/{rng.choice(cart_ids)}/validate', None),
+        'cart_validate_many': lambda rng: (
+            'POST', '/api/cart/validate', {'cart_ids': rng.sample(cart_ids, min(50, len(cart_ids)))}),
+        'cart_add_item': lambda rng: (
+            'POST', f'/api/cart/{rng.choice(cart_ids)}/items',
+            {'product_id': random_product(rng), 'quantity': 1}),
+    }
+
+
+def run_scenario(client, make_request, rng, duration: float, max_requests: int, warmup: int):
+    warmup_deadline = time.perf_counter() + duration
+    for _ in range(warmup):
+        method, path, body = make_request(rng)
+        client.open(path, method=method, json=body)
+        if time.perf_counter() > warmup_deadline:
+            break
+
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    deadline = started + duration
+    while len(latencies) < max_requests and time.perf_counter() < deadline:
+        method, path, body = make_request(rng)
+        request_started = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        response.get_data()
+        latencies.append(time.perf_counter() - request_started)
+        if response.status_code >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--carts', type=int, default=50000)
+    parser.add_argument('--cart-items', type=int, default=1000000, help='Cart lines across all carts.')
+    parser.add_argument('--database', help='SQLite file to seed once and reuse (default: a temporary file).')
+    parser.add_argument('--scenarios', nargs='+', help='Scenario names to run (default: all).')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per scenario.')
+    parser.add_argument('--requests', type=int, default=2000, help='Maximum requests per scenario.')
+    parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests per scenario (capped at --duration).')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if not os.environ.get('DATABASE_URL'):
+            path = os.path.abspath(args.database) if args.database else f'{directory}/suite.db'
+            os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+        app = create_app()
+        bootstrap_app(app, seed=False)
+
+        with app.app_context():
+            seed_s = None
+            if not db.session.scalar(select(func.count()).select_from(Product)):
+                started = time.perf_counter()
+                seed(args.products, args.carts, args.cart_items, random.Random(args.seed))
+                seed_s = round(time.perf_counter() - started, 1)
+            dataset = {
+                'products': db.session.scalar(select(func.count()).select_from(Product)),
+                'carts': db.session.scalar(select(func.count()).select_from(Cart)),
+                'cart_items': db.session.scalar(select(func.count()).select_from(CartItem)),
+            }
+            product_ids = list(db.session.scalars(
+                select(Product.id).where(Product.is_active == True, Product.stock > 0).order_by(Product.id)))
+            cart_ids = list(db.session.scalars(select(Cart.id).order_by(Cart.id)))
+            dialect = db.engine.dialect.name
+            db.session.remove()
+
+        commit = current_commit()
+        print(json.dumps({
+            'commit': commit, 'dialect': dialect, 'dataset': dataset, 'seed_s': seed_s, 'seed': args.seed,
+            'python': platform.python_version(), 'cpus': os.cpu_count(),
+        }), flush=True)
+
+        available = scenarios(product_ids, cart_ids)
+        unknown = set(args.scenarios or ()) - set(available)
+        if unknown:
+            raise SystemExit(f'unknown scenario(s): {", ".join(sorted(unknown))}')
+        client = app.test_client()
+        for name in args.scenarios or available:
+            result = run_scenario(client, available[name], random.Random(args.seed), args.duration,
+                                  args.requests, args.warmup)
+            result.update({'scenario': name, 'commit': commit})
+            print(json.dumps(result), flush=True)
+
+
+if __name__ == '__main__':
+    main()
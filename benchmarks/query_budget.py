@@ -0,0 +1,377 @@
+"""Query-budget check: SQL statements and rows fetched per API request.
+
+Drives every registered route through the Flask test client against a
+seeded SQLite database and records, for each request, how many statements
+it ran and how many rows it fetched. Each case declares a budget:
+statements is a hard cap, rows may grow by `rows_per_item` per cart item.
+Cart and order cases run at 1, 10 and 100 cart items and must issue the same
+number of statements at every size, so a lazy load or an extra lookup per
+item fails even while it stays under the cap.
+Routes without a case are reported as missing. Prints one JSON object per
+request and exits non-zero on any breach.
+
+Usage:
+    python -m benchmarks.query_budget
+    python -m benchmarks.query_budget --route cart.get --verbose
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['RATE_LIMIT_ENABLED'] = '0'
+os.environ['PRODUCT_CACHE_SIZE'] = '0'  # budget the cold path, not cache hits
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+
+from sqlalchemy import event, insert  # noqa: E402
+from app import create_app  # noqa: E402
+from bootstrap import bootstrap_app  # noqa: E402
+from models.cart import Cart, CartItem  # noqa: E402
+from models.database import db  # noqa: E402
+from models.product import Product  # noqa: E402
+from models.user import User  # noqa: E402
+from repositories.cart_repository import CartRepository  # noqa: E402
+from repositories.order_repository import OrderRepository  # noqa: E402
+from repositories.product_repository import ProductRepository  # noqa: E402
+from utils.tokens import token_manager  # noqa: E402
+
+CATEGORIES = ['Electronics', 'Home & Kitchen', 'Sports', 'Books', 'Toys']
+SCALES = (1, 10, 100)
+PRODUCTS = 150  # more than the largest cart plus the lines the cases add
+PASSWORD = 'budget-password'
+# Seeded user IDs for `Case.user`
+USERS = {'user': 1, 'admin': 2}
+
+
+class Budget(NamedTuple):
+    statements: int
+    rows: int
+    rows_per_item: int = 0
+
+
+class Case(NamedTuple):
+    """One request to measure.
+
+    `path` and `body` receive the fixture dict built by `setup`: `cart_id`,
+    `order_id`, `items` (cart size) and anything else the setup adds.
+    """
+    name: str
+    endpoint: str
+    method: str
+    path: Callable[[Dict[str, Any]], str]
+    budget: Budget
+    status: int = 200
+    body: Optional[Callable[[Dict[str, Any]], Any]] = None
+    setup: str = 'none'  # 'none', 'cart' or 'order'
+    conditional: bool = False  # send the ETag of a first, unmeasured response
+    data: Optional[Callable[[Dict[str, Any]], str]] = None  # raw body, sent as `content_type`
+    content_type: Optional[str] = None
+    user: Optional[str] = None  # send a bearer token for this seeded user: 'user' or 'admin'
+    owner: Optional[str] = None  # seeded user the fixture cart (and its order) belongs to
+
+
+CASES = [
+    Case('index', 'index', 'GET', lambda f: '/', Budget(0, 0)),
+    Case('health', 'health_check', 'GET', lambda f: '/health', Budget(0, 0)),
+    Case('metrics', 'metrics', 'GET', lambda f: '/metrics', Budget(0, 0)),
+
+    Case('products.list', 'products.get_products', 'GET', lambda f: '/api/products?limit=20', Budget(2, 21)),
+    Case('products.list[304]', 'products.get_products', 'GET', lambda f: '/api/products?limit=20',
+         Budget(1, 1), status=304, conditional=True),
+    Case('products.list[cursor]', 'products.get_products', 'GET', lambda f: '/api/products?cursor=&limit=20',
+         Budget(2, 22)),
+    Case('products.list[category]', 'products.get_products', 'GET',
+         lambda f: '/api/products?category=Books&limit=20', Budget(2, 21)),
+    Case('products.list[search]', 'products.get_products', 'GET',
+         lambda f: '/api/products?search=number&limit=20', Budget(2, 21)),
+    Case('products.list[stream]', 'products.get_products', 'GET', lambda f: '/api/products?stream=1',
+         Budget(1, 150)),
+    Case('products.detail', 'products.get_product_detail', 'GET', lambda f: '/api/products/1', Budget(2, 2)),
+    Case('products.availability', 'products.check_product_availability', 'GET',
+         lambda f: '/api/products/1/availability?quantity=2', Budget(1, 1)),
+    Case('products.categories', 'products.get_categories', 'GET', lambda f: '/api/products/categories',
+         Budget(2, 10)),
+    Case('products.search', 'products.search_products', 'GET', lambda f: '/api/products/search?q=number',
+         Budget(2, 21)),
+    Case('products.export', 'products.export_products', 'GET', lambda f: '/api/products/export', Budget(1, 150)),
+    Case('products.export[json]', 'products.export_products', 'GET',
+         lambda f: '/api/products/export?format=json&category=Books', Budget(1, 30)),
+    Case('products.import', 'products.import_products', 'POST', lambda f: '/api/products/import', Budget(2, 1),
+         data=lambda f: ''.join(json.dumps({'name': f'Imported {index}', 'description': 'Feed item',
+                                            'price': 5, 'stock': 3, 'category': 'Books'}) + '\n'
+                                for index in range(50)),
+         content_type='application/x-ndjson', user='admin'),
+    Case('products.import[forbidden]', 'products.import_products', 'POST', lambda f: '/api/products/import',
+         Budget(1, 1), status=403, data=lambda f: '{"name": "Spam"}\n', content_type='application/x-ndjson',
+         user='user'),
+    Case('products.sync', 'products.sync_products', 'POST', lambda f: '/api/products/sync', Budget(2, 101),
+         body=lambda f: {'updates': [{'id': product_id, 'price': 7.5, 'stock': 500 + product_id % 2}
+                                     for product_id in range(1, 101)]},
+         user='admin'),
+    Case('products.sync[forbidden]', 'products.sync_products', 'POST', lambda f: '/api/products/sync',
+         Budget(1, 1), status=403, body=lambda f: {'updates': [{'id': 1, 'price': 0.01}]}, user='user'),
+
+    Case('cart.create', 'cart.create_or_get_cart', 'POST', lambda f: '/api/cart', Budget(3, 1),
+         body=lambda f: {}),
+    Case('cart.get_existing', 'cart.create_or_get_cart', 'POST', lambda f: '/api/cart',
+         Budget(3, 2, 1), body=lambda f: {'cart_id': f['cart_id']}, setup='cart'),
+    Case('cart.get', 'cart.get_cart', 'GET', lambda f: f"/api/cart/{f['cart_id']}",
+         Budget(4, 3, 1), setup='cart'),
+    Case('cart.get[owner]', 'cart.get_cart', 'GET', lambda f: f"/api/cart/{f['cart_id']}",
+         Budget(4, 3, 1), setup='cart', owner='user', user='user'),
+    Case('cart.get[foreign]', 'cart.get_cart', 'GET', lambda f: f"/api/cart/{f['cart_id']}",
+         Budget(1, 1), status=404, setup='cart', owner='user', user='admin'),
+    Case('cart.get[304]', 'cart.get_cart', 'GET', lambda f: f"/api/cart/{f['cart_id']}",
+         Budget(2, 2), status=304, setup='cart', conditional=True),
+    Case('cart.add_item', 'cart.add_product_to_cart', 'POST', lambda f: f"/api/cart/{f['cart_id']}/items",
+         Budget(6, 4, 1),
+         body=lambda f: {'product_id': f['items'] + 1, 'quantity': 1}, setup='cart'),
+    Case('cart.add_item[anonymous]', 'cart.add_product_to_cart', 'POST',
+         lambda f: f"/api/cart/{f['cart_id']}/items", Budget(1, 1), status=404,
+         body=lambda f: {'product_id': 1, 'quantity': 1}, setup='cart', owner='user'),
+    Case('cart.batch', 'cart.batch_update_cart_items', 'POST',
+         lambda f: f"/api/cart/{f['cart_id']}/items:batch", Budget(8, 5, 1),
+         body=lambda f: {'operations': [
+             {'op': 'add', 'product_id': f['items'] + 1, 'quantity': 1},
+             {'op': 'update', 'product_id': 1, 'quantity': 3},
+             {'op': 'remove', 'product_id': f['items'] + 2},
+         ]}, setup='cart'),
+    Case('cart.update_item', 'cart.update_cart_item', 'PUT', lambda f: f"/api/cart/{f['cart_id']}/items/1",
+         Budget(6, 3, 1), body=lambda f: {'quantity': 2}, setup='cart'),
+    Case('cart.remove_item', 'cart.remove_product_from_cart', 'DELETE',
+         lambda f: f"/api/cart/{f['cart_id']}/items/1", Budget(6, 2, 1), setup='cart'),
+    Case('cart.clear', 'cart.clear_cart', 'POST', lambda f: f"/api/cart/{f['cart_id']}/clear",
+         Budget(5, 2), setup='cart'),
+    Case('cart.validate', 'cart.validate_cart', 'GET', lambda f: f"/api/cart/{f['cart_id']}/validate",
+         Budget(4, 2, 1), setup='cart'),
+    Case('cart.validate_many', 'cart.validate_carts', 'POST', lambda f: '/api/cart/validate',
+         Budget(2, 1), body=lambda f: {'cart_ids': [f['cart_id']]}, setup='cart'),
+    Case('cart.validate_many[foreign]', 'cart.validate_carts', 'POST', lambda f: '/api/cart/validate',
+         Budget(1, 0), body=lambda f: {'cart_ids': [f['cart_id']]}, setup='cart', owner='user'),
+    Case('cart.checkout', 'cart.checkout', 'POST', lambda f: f"/api/cart/{f['cart_id']}/checkout",
+         Budget(10, 3, 3), status=201, setup='cart'),
+    Case('cart.checkout[repeat]', 'cart.checkout', 'POST', lambda f: f"/api/cart/{f['cart_id']}/checkout",
+         Budget(5, 3, 2), setup='order'),
+
+    Case('orders.get', 'order.get_order', 'GET', lambda f: f"/api/orders/{f['order_id']}",
+         Budget(3, 2, 1), setup='order'),
+    Case('orders.get[foreign]', 'order.get_order', 'GET', lambda f: f"/api/orders/{f['order_id']}",
+         Budget(1, 1), status=404, setup='order', owner='user', user='admin'),
+    Case('orders.confirm', 'order.confirm_order', 'POST', lambda f: f"/api/orders/{f['order_id']}/confirm",
+         Budget(7, 3, 1), setup='order'),
+    Case('orders.cancel', 'order.cancel_order', 'POST', lambda f: f"/api/orders/{f['order_id']}/cancel",
+         Budget(6, 3, 3), setup='order'),
+
+    Case('auth.signup', 'auth.signup', 'POST', lambda f: '/api/auth/signup', Budget(2, 0), status=201,
+         body=lambda f: {'username': f"user-{uuid.uuid4().hex[:12]}", 'password': PASSWORD}),
+    Case('auth.login', 'auth.login', 'POST', lambda f: '/api/auth/login', Budget(1, 1),
+         body=lambda f: {'username': 'budget-user', 'password': PASSWORD}),
+]
+
+
+class Counter:
+    """Statements run and rows fetched while `active` is set."""
+
+    def __init__(self):
+        self.active = False
+        self.statements = 0
+        self.rows = 0
+        self.sql = []
+
+    def reset(self):
+        self.statements = 0
+        self.rows = 0
+        self.sql = []
+
+
+counter = Counter()
+
+
+class CountingCursor(sqlite3.Cursor):
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None and counter.active:
+            counter.rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        if counter.active:
+            counter.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if counter.active:
+            counter.rows += len(rows)
+        return rows
+
+
+class CountingConnection(sqlite3.Connection):
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+
+def instrument(engine) -> None:
+    @event.listens_for(engine, 'do_connect')
+    def _connect(dialect, connection_record, cargs, cparams):
+        cparams['factory'] = CountingConnection
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if counter.active:
+            counter.statements += 1
+            counter.sql.append(' '.join(statement.split()))
+
+    engine.dispose()  # connections opened before the hook lack the counting cursor
+
+
+def seed() -> None:
+    now = datetime.utcnow()
+    db.session.execute(insert(Product), [
+        {
+            'name': f'Product {index}',
+            'description': f'Synthetic item number {index}',
+            'price': Decimal('9.99'),
+            'stock': 100000,
+            'category': CATEGORIES[index % len(CATEGORIES)],
+            'is_active': True,
+            'updated_at': now,
+        }
+        for index in range(PRODUCTS)
+    ])
+    for name in USERS:
+        user = User(username=f'budget-{name}', is_admin=name == 'admin')
+        user.set_password(PASSWORD)
+        db.session.add(user)
+    db.session.commit()
+
+
+def make_cart(items: int, user_id: Optional[str] = None) -> str:
+    cart_id = str(uuid.uuid4())
+    db.session.execute(insert(Cart), [{'id': cart_id, 'user_id': user_id, 'updated_at': datetime.utcnow()}])
+    if items:
+        db.session.execute(insert(CartItem), [
+            {'cart_id': cart_id, 'product_id': product_id, 'quantity': 1}
+            for product_id in range(1, items + 1)
+        ])
+    db.session.commit()
+    return cart_id
+
+
+def make_fixture(setup: str, items: int, owner: Optional[str] = None) -> Dict[str, Any]:
+    fixture: Dict[str, Any] = {'items': items}
+    if setup in ('cart', 'order'):
+        fixture['cart_id'] = make_cart(items, str(USERS[owner]) if owner else None)
+    if setup == 'order':
+        cart = CartRepository().get_cart_by_id(fixture['cart_id'])
+        order, failed = OrderRepository(ProductRepository()).reserve_cart(cart, 900)
+        if order is None:
+            raise SystemExit(f'could not reserve fixture cart: {failed}')
+        fixture['order_id'] = order.id
+    db.session.remove()
+    return fixture
+
+
+def measure(app, client, case: Case, items: int) -> Dict[str, Any]:
+    with app.app_context():
+        fixture = make_fixture(case.setup, items, case.owner)
+    path = case.path(fixture)
+    kwargs: Dict[str, Any] = {}
+    headers = {}
+    if case.body is not None:
+        kwargs['json'] = case.body(fixture)
+    if case.data is not None:
+        kwargs['data'] = case.data(fixture)
+        kwargs['content_type'] = case.content_type
+    if case.user:
+        token = token_manager.issue({'user_id': USERS[case.user]}, timedelta(hours=1))
+        headers['Authorization'] = f'Bearer {token}'
+    if case.conditional:
+        etag = client.open(path, method=case.method, headers=headers, **kwargs).headers.get('ETag')
+        headers['If-None-Match'] = etag
+    kwargs['headers'] = headers
+
+    counter.reset()
+    counter.active = True
+    try:
+        response = client.open(path, method=case.method, **kwargs)
+    finally:
+        counter.active = False
+
+    budget = case.budget
+    row_budget = budget.rows + budget.rows_per_item * items
+    problems = []
+    if response.status_code != case.status:
+        problems.append(f'status {response.status_code} != {case.status}: {response.get_data(as_text=True)[:200]}')
+    if counter.statements > budget.statements:
+        problems.append(f'{counter.statements} statements > budget {budget.statements}')
+    if counter.rows > row_budget:
+        problems.append(f'{counter.rows} rows > budget {row_budget}')
+    result = {
+        'case': case.name, 'items': items, 'status': response.status_code,
+        'statements': counter.statements, 'statement_budget': budget.statements,
+        'rows': counter.rows, 'row_budget': row_budget, 'ok': not problems,
+    }
+    if problems:
+        result['problems'] = problems
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--route', action='append', default=[],
+                        help='Only run cases whose name starts with this prefix (repeatable).')
+    parser.add_argument('--verbose', action='store_true', help='Include the SQL of every request.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Always SQLite: rows are counted by a sqlite3 cursor subclass
+        os.environ['DATABASE_URL'] = f'sqlite:///{directory}/budget.db'
+        app = create_app()
+        bootstrap_app(app, seed=False)
+        with app.app_context():
+            instrument(db.engine)
+            seed()
+            db.session.remove()
+        client = app.test_client()
+
+        failures = 0
+        covered = {case.endpoint for case in CASES}
+        missing = sorted(rule.endpoint for rule in app.url_map.iter_rules()
+                         if rule.endpoint != 'static' and rule.endpoint not in covered)
+        for endpoint in missing:
+            failures += 1
+            print(json.dumps({'endpoint': endpoint, 'ok': False, 'problems': ['no budgeted case']}))
+
+        for case in CASES:
+            if args.route and not any(case.name.startswith(prefix) for prefix in args.route):
+                continue
+            statements = {}
+            for items in (SCALES if case.setup != 'none' else (0,)):
+                result = measure(app, client, case, items)
+                statements[items] = result['statements']
+                if args.verbose or not result['ok']:
+                    result['sql'] = counter.sql
+                failures += not result['ok']
+                print(json.dumps(result))
+            if len(set(statements.values())) > 1:
+                failures += 1
+                print(json.dumps({'case': case.name, 'statements': statements, 'ok': False,
+                                  'problems': ['statement count grows with the number of cart items']}))
+
+    if failures:
+        print(f'{failures} request(s) over budget or not covered', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""Query-plan regression check for the repository layer.
+
+Seeds a database with a large synthetic catalog, carts and orders, runs every
+repository query while recording the SQL it issues, then EXPLAINs each
+statement. A sequential scan over a table with at least `--min-rows` rows is
+a violation unless the query is listed in ALLOWED_SCANS. Prints one JSON
+object per repository call and exits non-zero on any violation.
+
+Usage:
+    python -m benchmarks.query_plans --products 20000 --carts 5000
+    DATABASE_URL=postgresql://... python -m benchmarks.query_plans
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, func, insert, select, text  # noqa: E402
+from app import create_app  # noqa: E402
+from bootstrap import bootstrap_app  # noqa: E402
+from models.cart import Cart, CartItem  # noqa: E402
+from models.database import db  # noqa: E402
+from models.order import Order, OrderItem, ORDER_RESERVED  # noqa: E402
+from models.product import Product  # noqa: E402
+from repositories.cart_repository import CartRepository  # noqa: E402
+from repositories.order_repository import OrderRepository  # noqa: E402
+from repositories.product_repository import ProductRepository  # noqa: E402
+from repositories.user_repository import UserRepository  # noqa: E402
+from utils.cache import NullCache  # noqa: E402
+
+CATEGORIES = ['Electronics', 'Home & Kitchen', 'Sports', 'Books', 'Toys',
+              'Garden', 'Beauty', 'Automotive', 'Music', 'Office']
+
+# Queries that read whole tables by design: name -> reason
+ALLOWED_SCANS = {
+    'product.get_all_products': 'returns every active product',
+    'product.get_products_page': 'the total COUNT reads every active product; the page walks id order '
+                                 'and stops at LIMIT (cursor pagination avoids the count)',
+    'product.get_listing_state': 'the listing ETag aggregates every active product, as the total COUNT does',
+}
+
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+# SQLite names aliased tables (e.g. joined loads) by their alias in the plan
+_SQL_ALIAS = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?\s+AS\s+"?(\w+)"?', re.IGNORECASE)
+
+
+def seed(products: int, carts: int, items_per_cart: int, orders: int) -> None:
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    db.session.execute(insert(Product), [
+        {
+            'name': f'Product {index}',
+            'description': f'Synthetic {CATEGORIES[index % len(CATEGORIES)].lower()} item number {index}',
+            'price': Decimal('9.99'),
+            'stock': 1000,
+            'category': CATEGORIES[index % len(CATEGORIES)],
+            'is_active': index % 10 != 0,
+            'updated_at': now,
+        }
+        for index in range(products)
+    ])
+    cart_ids = [str(uuid.uuid4()) for _ in range(carts)]
+    db.session.execute(insert(Cart), [
+        {'id': cart_id, 'user_id': f'user-{index}' if index % 2 else None, 'updated_at': now}
+        for index, cart_id in enumerate(cart_ids)
+    ])
+    db.session.execute(insert(CartItem), [
+        {'cart_id': cart_id, 'product_id': product_id, 'quantity': 1}
+        for cart_id in cart_ids
+        for product_id in rng.sample(range(1, products + 1), items_per_cart)
+    ])
+    order_ids = [str(uuid.uuid4()) for _ in range(orders)]
+    db.session.execute(insert(Order), [
+        {'id': order_id, 'cart_id': cart_ids[index % carts], 'status': ORDER_RESERVED,
+         'total': Decimal('9.99'), 'created_at': now, 'expires_at': now + timedelta(minutes=15)}
+        for index, order_id in enumerate(order_ids)
+    ])
+    db.session.execute(insert(OrderItem), [
+        {'order_id': order_id, 'product_id': rng.randint(1, products), 'product_name': 'Product',
+         'quantity': 1, 'unit_price': Decimal('9.99')}
+        for order_id in order_ids
+    ])
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+
+
+def repository_calls():
+    """(name, callable) pairs covering the repository queries."""
+    products = ProductRepository(cache=NullCache())
+    carts = CartRepository()
+    orders = OrderRepository(products)
+    users = UserRepository()
+    cart = Cart.query.filter(Cart.user_id.is_not(None)).first()
+    other_cart = Cart.query.filter(Cart.id != cart.id).first()
+    order = Order.query.first()
+    product_id = db.session.scalar(select(func.max(Product.id)).where(Product.is_active == True))
+
+    return [
+        ('product.get_all_products', lambda: products.get_all_products()),
+        ('product.get_product_by_id', lambda: products.get_product_by_id(product_id, use_cache=False)),
+        ('product.get_products_by_ids', lambda: products.get_products_by_ids([1, 2, product_id])),
+        ('product.get_products_by_category', lambda: products.get_products_by_category('Books')),
+        ('product.get_category_counts', lambda: products.get_category_counts()),
+        ('product.get_products_page', lambda: products.get_products_page(20, 200)),
+        ('product.get_products_page[category]', lambda: products.get_products_page(20, 200, 'Sports')),
+        ('product.get_products_after', lambda: products.get_products_after(product_id // 2, 20)),
+        ('product.get_products_after[category]', lambda: products.get_products_after(100, 20, 'Toys')),
+        ('product.get_listing_state', lambda: products.get_listing_state()),
+        ('product.get_listing_state[category]', lambda: products.get_listing_state('Toys')),
+        ('product.search_products_page', lambda: products.search_products_page('number 4242', 20)),
+        ('product.update_stock', lambda: products.update_stock(product_id, -1)),
+        ('product.update_stock_bulk', lambda: products.update_stock_bulk({product_id: -1, 2: -1})),
+        ('cart.get_cart_by_id', lambda: carts.get_cart_by_id(cart.id)),
+        ('cart.get_cart_by_user_id', lambda: carts.get_cart_by_user_id(cart.user_id)),
+        ('cart.get_cart_state', lambda: carts.get_cart_state(cart.id)),
+        ('cart.add_item_to_cart', lambda: carts.add_item_to_cart(cart.id, product_id, 1)),
+        ('cart.update_item_quantity', lambda: carts.update_item_quantity(cart.id, product_id, 3)),
+        ('cart.remove_item_from_cart', lambda: carts.remove_item_from_cart(cart.id, product_id)),
+        ('cart.apply_item_operations', lambda: carts.apply_item_operations(
+            cart.id, [{'op': 'add', 'product_id': product_id, 'quantity': 1}])),
+        ('cart.get_item_counts', lambda: carts.get_item_counts([cart.id, other_cart.id])),
+        ('cart.get_checkout_issues', lambda: carts.get_checkout_issues([cart.id, other_cart.id])),
+        ('order.get_order_by_id', lambda: orders.get_order_by_id(order.id)),
+        ('order.get_live_reservation', lambda: orders.get_live_reservation(order.cart_id)),
+        ('order.reserve_cart', lambda: orders.reserve_cart(carts.get_cart_by_id(other_cart.id), 900)),
+        ('order.place_order', lambda: orders.place_order(order.id)),
+        ('order.release_expired_reservations', lambda: orders.release_expired_reservations()),
+        ('order.release_expired_reservations[products]',
+         lambda: orders.release_expired_reservations(20, [1, product_id])),
+        ('cart.clear_cart', lambda: carts.clear_cart(other_cart.id)),
+        ('user.get_user_by_username', lambda: users.get_user_by_username('nobody')),
+    ]
+
+
+def explain(connection, dialect: str, statement: str, parameters):
+    """Return (plan lines, tables scanned sequentially) for one statement."""
+    if dialect == 'sqlite':
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+        lines = [row[-1] for row in rows]
+        aliases = {alias: table for table, alias in _SQL_ALIAS.findall(statement)}
+        scans = [aliases.get(match.group(1), match.group(1)) for match in map(_SQLITE_SCAN.match, lines) if match]
+        return lines, scans
+    if dialect == 'postgresql':
+        plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters).scalar()
+        lines, scans = [], []
+        nodes = [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            lines.append(f"{node['Node Type']} {node.get('Relation Name', '')}".strip())
+            if node['Node Type'] == 'Seq Scan':
+                scans.append(node['Relation Name'])
+            nodes.extend(node.get('Plans', []))
+        return lines, scans
+    raise SystemExit(f'EXPLAIN check does not support the {dialect} dialect')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--carts', type=int, default=5000)
+    parser.add_argument('--items-per-cart', type=int, default=4)
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--min-rows', type=int, default=1000,
+                        help='Sequential scans over smaller tables are not reported.')
+    parser.add_argument('--verbose', action='store_true', help='Include the plan of every statement.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if not os.environ.get('DATABASE_URL'):
+            os.environ['DATABASE_URL'] = f'sqlite:///{directory}/plans.db'
+        os.environ.setdefault('PRODUCT_CACHE_SIZE', '0')
+        app = create_app()
+        bootstrap_app(app, seed=False)
+
+        violations = 0
+        with app.app_context():
+            seed(args.products, args.carts, args.items_per_cart, args.orders)
+            dialect = db.engine.dialect.name
+            row_counts = {
+                table.name: db.session.scalar(select(func.count()).select_from(table))
+                for table in db.metadata.sorted_tables
+            }
+            large_tables = {name for name, count in row_counts.items() if count >= args.min_rows}
+            if not large_tables:
+                raise SystemExit(f'no seeded table reaches --min-rows {args.min_rows}: {row_counts}')
+
+            captured = []
+
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                if not executemany and not statement.lstrip().upper().startswith('INSERT'):
+                    captured.append((statement, parameters))
+
+            for name, call in repository_calls():
+                captured.clear()
+                event.listen(db.engine, 'before_cursor_execute', capture)
+                try:
+                    call()
+                finally:
+                    event.remove(db.engine, 'before_cursor_execute', capture)
+
+                plans, bad = [], []
+                with db.engine.connect() as connection:
+                    for statement, parameters in captured:
+                        lines, scans = explain(connection, dialect, statement, parameters)
+                        plans.append({'sql': ' '.join(statement.split())[:120], 'plan': lines})
+                        bad.extend(table for table in scans if table in large_tables)
+                    connection.rollback()
+
+                allowed = name in ALLOWED_SCANS
+                if bad and not allowed:
+                    violations += 1
+                result = {'query': name, 'statements': len(captured), 'seq_scans': sorted(set(bad)),
+                          'ok': not bad or allowed}
+                if allowed and bad:
+                    result['allowed'] = ALLOWED_SCANS[name]
+                if args.verbose or (bad and not allowed):
+                    result['plans'] = plans
+                print(json.dumps(result))
+            db.session.remove()
+
+    if violations:
+        print(f'{violations} quer(ies) scan large tables sequentially', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
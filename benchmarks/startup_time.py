@@ -0,0 +1,67 @@
+"""Measure worker startup cost: cold import, `create_app()` and first request.
+
+Each run is a fresh interpreter against a SQLite database bootstrapped once
+up front, so the numbers reflect what a newly forked or autoscaled worker
+pays. Prints one JSON object with the median of each phase.
+
+Usage:
+    python -m benchmarks.startup_time --runs 10
+    python -m benchmarks.startup_time --path /api/cart/<id>
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get(sys.argv[1])
+served = time.perf_counter()
+print(json.dumps({
+    "cold_import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": (served - created) * 1000,
+    "status": response.status_code,
+    "heavy_modules_loaded": sorted(m for m in ("bcrypt", "jwt") if m in sys.modules),
+}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/api/products?limit=20')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ)
+        env.setdefault('DATABASE_URL', f'sqlite:///{directory}/startup.db')
+        subprocess.run([sys.executable, 'bootstrap.py'], cwd=ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+
+        samples = []
+        for _ in range(args.runs):
+            output = subprocess.run([sys.executable, '-c', PROBE, args.path], cwd=ROOT, env=env,
+                                    check=True, capture_output=True, text=True).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    result = {'runs': args.runs, 'path': args.path}
+    for phase in ('cold_import_ms', 'create_app_ms', 'first_request_ms'):
+        result[phase] = round(statistics.median(sample[phase] for sample in samples), 2)
+    result['statuses'] = sorted({sample['status'] for sample in samples})
+    result['heavy_modules_loaded'] = samples[-1]['heavy_modules_loaded']
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Multi-threaded stress test for stock decrements on a single hot SKU.
+
+Threads repeatedly buy one unit of the same product until it sells out and
+the run checks that successful purchases never exceed the starting stock.
+`--strategy atomic` uses ProductRepository.update_stock (conditional UPDATE);
+`--strategy read-modify-write` replays the old SELECT-check-UPDATE pattern
+for comparison. Prints one JSON object per strategy and exits non-zero if
+the atomic strategy oversold or lost an update.
+
+Usage:
+    python -m benchmarks.stock_contention --threads 16 --stock 500
+    DATABASE_URL=postgresql://... python -m benchmarks.stock_contention
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from bootstrap import bootstrap_app  # noqa: E402
+from models.database import db  # noqa: E402
+from models.product import Product  # noqa: E402
+from repositories.product_repository import ProductRepository  # noqa: E402
+
+
+def read_modify_write(product_id: int) -> bool:
+    product = db.session.get(Product, product_id, populate_existing=True)
+    if product and product.stock - 1 >= 0:
+        product.stock -= 1
+        db.session.commit()
+        return True
+    db.session.rollback()
+    return False
+
+
+def run(app, strategy: str, threads: int, stock: int):
+    with app.app_context():
+        product = Product(name='Hot SKU', description='Stress test product', price=Decimal('1.00'),
+                          stock=stock, category='Benchmark')
+        db.session.add(product)
+        db.session.commit()
+        product_id = product.id
+
+    sold = [0]
+    errors = [0]
+    lock = threading.Lock()
+    repository = ProductRepository()
+
+    def buyer():
+        local_sold = 0
+        local_errors = 0
+        with app.app_context():
+            while True:
+                try:
+                    if strategy == 'atomic':
+                        bought = repository.update_stock(product_id, -1)
+                    else:
+                        bought = read_modify_write(product_id)
+                except Exception:
+                    db.session.rollback()
+                    local_errors += 1
+                    continue
+                if not bought:
+                    break
+                local_sold += 1
+            db.session.remove()
+        with lock:
+            sold[0] += local_sold
+            errors[0] += local_errors
+
+    workers = [threading.Thread(target=buyer) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        final_stock = db.session.get(Product, product_id).stock
+    return {
+        'strategy': strategy,
+        'threads': threads,
+        'initial_stock': stock,
+        'units_sold': sold[0],
+        'final_stock': final_stock,
+        'oversold': sold[0] - stock if sold[0] > stock else 0,
+        'consistent': sold[0] + final_stock == stock,
+        'errors': errors[0],
+        'elapsed_s': round(elapsed, 3),
+        'throughput_ops': round(sold[0] / elapsed, 1) if elapsed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--stock', type=int, default=500)
+    parser.add_argument('--strategy', choices=['atomic', 'read-modify-write', 'both'], default='both')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if not os.environ.get('DATABASE_URL'):
+            os.environ['DATABASE_URL'] = f'sqlite:///{directory}/stock.db?timeout=30'
+        os.environ.setdefault('PRODUCT_CACHE_SIZE', '0')
+        app = create_app()
+        bootstrap_app(app, seed=False)
+
+        strategies = ['atomic', 'read-modify-write'] if args.strategy == 'both' else [args.strategy]
+        results = [run(app, strategy, args.threads, args.stock) for strategy in strategies]
+        for result in results:
+            print(json.dumps(result))
+
+    if any(result['strategy'] == 'atomic' and not (result['oversold'] == 0 and result['consistent'])
+           for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Microbenchmark: bearer-token verification with and without the verified-token cache.
+
+Verifies the same set of tokens (`--tokens` distinct clients) `--iterations`
+times through TokenManager, once with the cache disabled (full HMAC and JSON
+decode on every call) and once with it enabled. Prints one JSON object per
+mode with throughput and per-call latency.
+
+Usage:
+    python -m benchmarks.token_verification --iterations 50000 --tokens 100
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.tokens import TokenManager  # noqa: E402
+
+
+def run(mode: str, iterations: int, token_count: int):
+    manager = TokenManager(keys=[('current', 'benchmark-secret'), ('previous', 'old-secret')],
+                           cache_size=0 if mode == 'uncached' else 10000)
+    tokens = [manager.issue({'user_id': index}, datetime.timedelta(hours=1)) for index in range(token_count)]
+
+    started = time.perf_counter()
+    for index in range(iterations):
+        manager.verify(tokens[index % token_count])
+    elapsed = time.perf_counter() - started
+
+    return {
+        'mode': mode,
+        'iterations': iterations,
+        'distinct_tokens': token_count,
+        'elapsed_s': round(elapsed, 3),
+        'verifications_per_s': round(iterations / elapsed, 1),
+        'us_per_verification': round(elapsed / iterations * 1e6, 2),
+        'cache': manager.cache.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=50000)
+    parser.add_argument('--tokens', type=int, default=100)
+    args = parser.parse_args()
+
+    for mode in ('uncached', 'cached'):
+        print(json.dumps(run(mode, args.iterations, args.tokens)))
+
+
+if __name__ == '__main__':
+    main()
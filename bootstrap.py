@@ -0,0 +1,47 @@
+"""Database bootstrap: schema creation, upgrades, search index and sample data.
+
+Run once per deploy rather than in every worker:
+
+    flask --app app bootstrap            # or: python bootstrap.py
+    flask --app app bootstrap --no-seed
+"""
+import click
+from flask import Flask
+from flask.cli import with_appcontext
+from models.database import db
+from models.schema import upgrade_schema
+from repositories.product_repository import ProductRepository
+
+
+def bootstrap_database(seed: bool = True) -> None:
+    """Create missing tables and columns, install the search index and seed sample data.
+
+    Must run inside an application context. Every step is idempotent.
+    """
+    db.create_all()
+    upgrade_schema()
+    product_repository = ProductRepository()
+    product_repository.install_search_index()
+    if seed:
+        product_repository.populate_db()
+
+
+@click.command('bootstrap')
+@click.option('--seed/--no-seed', default=True, help='Insert sample products into an empty catalog.')
+@with_appcontext
+def bootstrap_command(seed: bool) -> None:
+    """Create or upgrade the database schema."""
+    bootstrap_database(seed)
+    click.echo('Database bootstrapped')
+
+
+def bootstrap_app(app: Flask, seed: bool = True) -> None:
+    """Run `bootstrap_database` for an application outside a request."""
+    with app.app_context():
+        bootstrap_database(seed)
+
+
+if __name__ == '__main__':
+    from app import create_app
+    bootstrap_app(create_app())
+    print('Database bootstrapped')
@@ -0,0 +1,65 @@
+"""Maintenance commands run outside the request path.
+
+    flask --app app release-reservations     # e.g. from cron every minute
+    flask --app app import-products feed.ndjson
+    flask --app app grant-admin alice
+"""
+import io
+import click
+from flask.cli import with_appcontext
+from repositories.order_repository import OrderRepository
+from repositories.product_repository import ProductRepository
+from repositories.user_repository import UserRepository
+from services.product_service import DEFAULT_IMPORT_BATCH_SIZE, ProductService
+from utils.feeds import FEED_FORMATS, feed_format, read_feed
+
+
+@click.command('release-reservations')
+@click.option('--batch-size', default=500, show_default=True, help='Reservations released per transaction.')
+@with_appcontext
+def release_reservations_command(batch_size: int) -> None:
+    """Return the stock held by expired checkout reservations."""
+    order_repository = OrderRepository()
+    total = 0
+    while True:
+        released = order_repository.release_expired_reservations(batch_size)
+        if not released:
+            break
+        total += released
+    click.echo(f'Released {total} expired reservation(s)')
+
+
+@click.command('import-products')
+@click.argument('feed', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--format', 'feed_type', type=click.Choice(FEED_FORMATS),
+              help='Feed format (default: from the file extension).')
+@click.option('--batch-size', default=DEFAULT_IMPORT_BATCH_SIZE, show_default=True,
+              help='Products inserted per statement and commit.')
+@with_appcontext
+def import_products_command(feed: str, feed_type: str, batch_size: int) -> None:
+    """Create products from an NDJSON or CSV FEED file ('-' for stdin)."""
+    feed_type = feed_type or feed_format(feed)
+    if feed_type is None:
+        raise click.UsageError('Cannot tell the feed format from the file name; pass --format')
+    with click.open_file(feed, 'rb') as raw:
+        stream = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='' if feed_type == 'csv' else None)
+        result = ProductService(ProductRepository()).import_products(read_feed(stream, feed_type), batch_size)
+    for error in result['errors']:
+        click.echo(f"line {error['line']}: {'; '.join(error['errors'])}", err=True)
+    if result['errors_truncated']:
+        click.echo(f"... {result['failed'] - len(result['errors'])} more invalid row(s)", err=True)
+    click.echo(f"Imported {result['imported']} product(s), {result['failed']} invalid row(s)")
+    if result['failed']:
+        raise SystemExit(1)
+
+
+@click.command('grant-admin')
+@click.argument('username')
+@click.option('--revoke', is_flag=True, help='Remove the admin flag instead of granting it.')
+@with_appcontext
+def grant_admin_command(username: str, revoke: bool) -> None:
+    """Allow USERNAME to import and sync products (or revoke it)."""
+    user = UserRepository().set_admin(username, not revoke)
+    if user is None:
+        raise click.ClickException(f'No user named {username!r}')
+    click.echo(f"{'Revoked' if revoke else 'Granted'} admin for {username}")
@@ -1,7 +1,12 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, g, request, jsonify
 from services.cart_service import CartService
+from services.order_service import OrderService
 from repositories.cart_repository import CartRepository
+from repositories.order_repository import OrderRepository
 from repositories.product_repository import ProductRepository
+from utils.http_cache import not_modified, with_validators
+from utils.instrumentation import TimedService
+from utils.rate_limit import rate_limited
 
 # Create blueprint
 cart_bp = Blueprint('cart', __name__, url_prefix='/api/cart')
@@ -9,22 +14,46 @@ cart_bp = Blueprint('cart', __name__, url_prefix='/api/cart')
 # Initialize dependencies
 cart_repository = CartRepository()
 product_repository = ProductRepository()
-cart_service = CartService(cart_repository, product_repository)
+cart_service = TimedService(CartService(cart_repository, product_repository))
+order_service = TimedService(OrderService(OrderRepository(product_repository), cart_repository))
+
+MAX_BATCH_OPERATIONS = 100
 
 
 @cart_bp.route('', methods=['POST'])
 def create_or_get_cart():
     """
     Create a new cart or get existing cart.
+    Carts that belong to a user are only reachable with that user's token,
+    here and on every other cart and order endpoint.
     Request body (optional):
     - cart_id: Existing cart ID
-    - user_id: User ID for the cart
+    - user_id: User ID for the cart; must match the bearer token's user
+    With a bearer token the cart belongs to the authenticated user.
     """
     try:
         data = request.get_json() or {}
         cart_id = data.get('cart_id')
         user_id = data.get('user_id')
         
+        if g.current_user_id is not None:
+            if user_id is not None and str(user_id) != str(g.current_user_id):
+                return jsonify({
+                    'success': False,
+                    'message': 'user_id does not match the authenticated user'
+                }), 403
+            user_id = str(g.current_user_id)
+        elif user_id is not None:
+            return jsonify({
+                'success': False,
+                'message': 'Authentication required to attach a cart to a user'
+            }), 401
+        
+        if cart_id:
+            denied = _deny_foreign_cart(cart_id)
+            if denied:
+                return denied
+        
         result = cart_service.get_or_create_cart(cart_id=cart_id, user_id=user_id)
         
         return jsonify(result), 200
@@ -40,12 +69,26 @@ def create_or_get_cart():
 def get_cart(cart_id: str):
     """
     Get cart details by cart ID.
+    Supports If-None-Match / If-Modified-Since; a match returns 304 without loading items.
     """
     try:
+        denied = _deny_foreign_cart(cart_id)
+        if denied:
+            return denied
+        
+        validators = cart_service.get_cart_etag(cart_id)
+        if validators:
+            cached = not_modified(*validators)
+            if cached:
+                return cached
+        
         result = cart_service.get_cart_details(cart_id)
         
         if result['success']:
-            return jsonify(result), 200
+            response = jsonify(result)
+            if validators:
+                with_validators(response, *validators)
+            return response, 200
         else:
             return jsonify(result), 404
             
@@ -65,6 +108,10 @@ def add_product_to_cart(cart_id: str):
     - quantity: Quantity to add (default: 1)
     """
     try:
+        denied = _deny_foreign_cart(cart_id)
+        if denied:
+            return denied
+        
         data = request.get_json()
         
         if not data:
@@ -106,6 +153,91 @@ def add_product_to_cart(cart_id: str):
         }), 500
 
 
+@cart_bp.route('/<cart_id>/items:batch', methods=['POST'])
+def batch_update_cart_items(cart_id: str):
+    """
+    Apply many item operations to the cart in one call.
+    Request body:
+    - operations: List (max 100) of objects with
+      - op: 'add', 'update' or 'remove' (required)
+      - product_id: ID of the product (required)
+      - quantity: Quantity to add (add, default: 1) or new quantity (update, 0 removes)
+    Each operation is reported in `results`; the cart is returned once.
+    """
+    try:
+        denied = _deny_foreign_cart(cart_id)
+        if denied:
+            return denied
+        
+        data = request.get_json(silent=True) or {}
+        operations = data.get('operations')
+        
+        if not isinstance(operations, list) or not operations:
+            return jsonify({
+                'success': False,
+                'message': 'operations must be a non-empty list'
+            }), 400
+        
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return jsonify({
+                'success': False,
+                'message': f'operations cannot contain more than {MAX_BATCH_OPERATIONS} items'
+            }), 400
+        
+        normalized = []
+        for index, operation in enumerate(operations):
+            error = None
+            if not isinstance(operation, dict):
+                error = 'must be an object'
+            elif operation.get('op') not in ('add', 'update', 'remove'):
+                error = "op must be 'add', 'update' or 'remove'"
+            elif not _is_int(operation.get('product_id')) or operation['product_id'] <= 0:
+                error = 'product_id must be a positive integer'
+            elif operation['op'] == 'add' and (not _is_int(operation.get('quantity', 1)) or operation.get('quantity', 1) <= 0):
+                error = 'quantity must be a positive integer'
+            elif operation['op'] == 'update' and (not _is_int(operation.get('quantity')) or operation['quantity'] < 0):
+                error = 'quantity must be a non-negative integer'
+            if error:
+                return jsonify({
+                    'success': False,
+                    'message': f'operations[{index}]: {error}'
+                }), 400
+            normalized.append({
+                'op': operation['op'],
+                'product_id': operation['product_id'],
+                'quantity': operation.get('quantity', 1) if operation['op'] != 'remove' else 0
+            })
+        
+        result = cart_service.apply_cart_operations(cart_id, normalized)
+        
+        status_code = 200 if result['success'] else 404
+        return jsonify(result), status_code
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error updating cart items: {str(e)}'
+        }), 500
+
+
+def _deny_foreign_cart(cart_id: str):
+    """Return a 404 response if the cart belongs to another user, else None.
+    
+    Owned carts answer as missing rather than 403 so their IDs cannot be probed.
+    """
+    if cart_service.is_owned_by_other(cart_id, g.current_user_id):
+        return jsonify({
+            'success': False,
+            'message': 'Cart not found'
+        }), 404
+    return None
+
+
+def _is_int(value) -> bool:
+    # bool is a subclass of int but not a valid ID or quantity
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
 @cart_bp.route('/<cart_id>/items/<int:product_id>', methods=['PUT'])
 def update_cart_item(cart_id: str, product_id: int):
     """
@@ -114,6 +246,10 @@ def update_cart_item(cart_id: str, product_id: int):
     - quantity: New quantity (0 to remove item)
     """
     try:
+        denied = _deny_foreign_cart(cart_id)
+        if denied:
+            return denied
+        
         data = request.get_json()
         
         if not data:
@@ -154,6 +290,10 @@ def remove_product_from_cart(cart_id: str, product_id: int):
     Remove a product from the cart.
     """
     try:
+        denied = _deny_foreign_cart(cart_id)
+        if denied:
+            return denied
+        
         result = cart_service.remove_product_from_cart(cart_id, product_id)
         
         status_code = 200 if result['success'] else 400
@@ -172,6 +312,10 @@ def clear_cart(cart_id: str):
     Clear all items from the cart.
     """
     try:
+        denied = _deny_foreign_cart(cart_id)
+        if denied:
+            return denied
+        
         result = cart_service.clear_cart(cart_id)
         
         status_code = 200 if result['success'] else 404
@@ -185,11 +329,16 @@ def clear_cart(cart_id: str):
 
 
 @cart_bp.route('/<cart_id>/validate', methods=['GET'])
+@rate_limited('validate')
 def validate_cart(cart_id: str):
     """
     Validate cart for checkout (check stock availability, active products, etc.).
     """
     try:
+        denied = _deny_foreign_cart(cart_id)
+        if denied:
+            return denied
+        
         result = cart_service.validate_cart_for_checkout(cart_id)
         
         return jsonify({
@@ -204,6 +353,79 @@ def validate_cart(cart_id: str):
         }), 500
 
 
+@cart_bp.route('/validate', methods=['POST'])
+@rate_limited('validate')
+def validate_carts():
+    """
+    Validate many carts for checkout in one call.
+    Request body:
+    - cart_ids: List of cart IDs to validate (required, max 500)
+    Carts of other users are reported as not found.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        cart_ids = data.get('cart_ids')
+        
+        if not isinstance(cart_ids, list) or not cart_ids:
+            return jsonify({
+                'success': False,
+                'message': 'cart_ids must be a non-empty list'
+            }), 400
+        
+        if len(cart_ids) > 500:
+            return jsonify({
+                'success': False,
+                'message': 'cart_ids cannot contain more than 500 carts'
+            }), 400
+        
+        if not all(isinstance(cart_id, str) for cart_id in cart_ids):
+            return jsonify({
+                'success': False,
+                'message': 'cart_ids must contain strings'
+            }), 400
+        
+        results = cart_service.validate_carts_for_checkout(cart_ids, g.current_user_id)
+        
+        return jsonify({
+            'success': True,
+            'data': results
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error validating carts: {str(e)}'
+        }), 500
+
+
+@cart_bp.route('/<cart_id>/checkout', methods=['POST'])
+@rate_limited('validate')
+def checkout(cart_id: str):
+    """
+    Reserve stock for every item in the cart and create a reserved order.
+    The reservation must be confirmed at POST /api/orders/<order_id>/confirm
+    before it expires (CHECKOUT_RESERVATION_TTL seconds). Repeating the call
+    returns the same reservation with 200 while the cart is unchanged.
+    """
+    try:
+        denied = _deny_foreign_cart(cart_id)
+        if denied:
+            return denied
+        
+        result = order_service.checkout(cart_id)
+        
+        if result['success']:
+            return jsonify(result), 200 if result['reused'] else 201
+        status_code = 404 if result['message'] == 'Cart not found' else 409
+        return jsonify(result), status_code
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error during checkout: {str(e)}'
+        }), 500
+
+
 # Error handlers for the blueprint
 @cart_bp.errorhandler(404)
 def not_found(error):
@@ -0,0 +1,111 @@
+from flask import Blueprint, g, jsonify
+from services.order_service import OrderService
+from repositories.cart_repository import CartRepository
+from repositories.order_repository import OrderRepository
+from repositories.product_repository import ProductRepository
+from utils.instrumentation import TimedService
+
+# Create blueprint
+order_bp = Blueprint('order', __name__, url_prefix='/api/orders')
+
+# Initialize dependencies
+order_repository = OrderRepository(ProductRepository())
+order_service = TimedService(OrderService(order_repository, CartRepository()))
+
+
+@order_bp.route('/<order_id>', methods=['GET'])
+def get_order(order_id: str):
+    """
+    Get an order by ID.
+    """
+    try:
+        denied = _deny_foreign_order(order_id)
+        if denied:
+            return denied
+
+        result = order_service.get_order(order_id)
+
+        status_code = 200 if result['success'] else 404
+        return jsonify(result), status_code
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error retrieving order: {str(e)}'
+        }), 500
+
+
+@order_bp.route('/<order_id>/confirm', methods=['POST'])
+def confirm_order(order_id: str):
+    """
+    Confirm a reserved order, turning its stock reservation into a placed order.
+    """
+    try:
+        denied = _deny_foreign_order(order_id)
+        if denied:
+            return denied
+
+        result = order_service.confirm_order(order_id)
+
+        if result['success']:
+            return jsonify(result), 200
+        status_code = 404 if result['order'] is None else 409
+        return jsonify(result), status_code
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error confirming order: {str(e)}'
+        }), 500
+
+
+@order_bp.route('/<order_id>/cancel', methods=['POST'])
+def cancel_order(order_id: str):
+    """
+    Cancel a reserved order and return its stock.
+    """
+    try:
+        denied = _deny_foreign_order(order_id)
+        if denied:
+            return denied
+
+        result = order_service.cancel_order(order_id)
+
+        if result['success']:
+            return jsonify(result), 200
+        status_code = 404 if result['order'] is None else 409
+        return jsonify(result), status_code
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error cancelling order: {str(e)}'
+        }), 500
+
+
+def _deny_foreign_order(order_id: str):
+    """Return a 404 response if the order belongs to another user, else None."""
+    if order_service.is_owned_by_other(order_id, g.current_user_id):
+        return jsonify({
+            'success': False,
+            'message': 'Order not found',
+            'order': None
+        }), 404
+    return None
+
+
+# Error handlers for the blueprint
+@order_bp.errorhandler(404)
+def not_found(error):
+    return jsonify({
+        'success': False,
+        'message': 'Endpoint not found'
+    }), 404
+
+
+@order_bp.errorhandler(405)
+def method_not_allowed(error):
+    return jsonify({
+        'success': False,
+        'message': 'Method not allowed'
+    }), 405
@@ -1,17 +1,40 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, g, request, jsonify, stream_with_context
 from typing import Optional
+import io
 from services.product_service import ProductService
+from services.user_service import UserService
 from repositories.product_repository import ProductRepository
+from repositories.user_repository import UserRepository
+from utils.feeds import feed_format, read_feed
+from utils.http_cache import not_modified, with_validators
+from utils.instrumentation import TimedService
+from utils.rate_limit import rate_limited
+from utils.serialization import iter_json_array, iter_json_lines
 
 # Create blueprint
 product_bp = Blueprint('products', __name__, url_prefix='/api/products')
 
 # Initialize dependencies
 product_repository = ProductRepository()
-product_service = ProductService(product_repository)
+product_service = TimedService(ProductService(product_repository))
+user_service = TimedService(UserService(UserRepository()))
+
+# Page sizes for cursor pagination and search
+DEFAULT_PAGE_LIMIT = 20
+MAX_PAGE_LIMIT = 100
+
+# Updates accepted by one /sync request
+MAX_SYNC_UPDATES = 10000
+
+# format -> (mimetype, file extension) for /export
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'json': ('application/json', 'json')
+}
 
 
 @product_bp.route('', methods=['GET'])
+@rate_limited('search', when=lambda: bool(request.args.get('search')))
 def get_products():
     """
     Get all products with optional filtering.
@@ -20,6 +43,10 @@ def get_products():
     - search: Search in name and description
     - limit: Limit number of results
     - offset: Offset for pagination
+    - cursor: Opaque keyset cursor; pass it empty for the first page and then
+      the returned next_cursor (limit defaults to 20 in this mode)
+    - stream: 1 to stream the full list as it is read from the database
+      (same body as without limit; no ETag, not combinable with limit/cursor)
     """
     try:
         category = request.args.get('category')
@@ -27,29 +54,84 @@ def get_products():
         limit = request.args.get('limit', type=int)
         offset = request.args.get('offset', type=int, default=0)
         
-        products = product_service.get_all_products(category=category, search=search)
+        if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+            if limit is not None or 'cursor' in request.args:
+                return jsonify({
+                    'success': False,
+                    'message': 'stream cannot be combined with limit or cursor'
+                }), 400
+            
+            body = iter_json_array(product_service.iter_products(category=category, search=search),
+                                   prefix=b'{"success":true,"data":[',
+                                   suffix=lambda count: b'],"total":%d}' % count)
+            return Response(stream_with_context(body), mimetype='application/json'), 200
+        
+        if limit is not None and limit <= 0:
+            return jsonify({
+                'success': False,
+                'message': 'limit must be greater than 0'
+            }), 400
+        
+        if offset < 0:
+            return jsonify({
+                'success': False,
+                'message': 'offset must be non-negative'
+            }), 400
+        
+        cursor = request.args.get('cursor') if 'cursor' in request.args else None
+        if cursor is not None:
+            limit = min(limit or DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT)
         
-        # Apply pagination if limit is specified
+        # Answer conditional requests from one aggregate before loading products
+        try:
+            etag, total = product_service.get_products_etag(category, search, limit, offset, cursor)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        # Keyset pagination: cost does not grow with page depth
+        if cursor is not None:
+            page = product_service.get_products_by_cursor(limit, cursor, category=category, search=search)
+            
+            return with_validators(jsonify({
+                'success': True,
+                'data': page['products'],
+                'pagination': {
+                    'limit': limit,
+                    'next_cursor': page['next_cursor'],
+                    'has_more': page['has_more']
+                }
+            }), etag), 200
+        
+        # Apply pagination in the database if limit is specified
         if limit:
-            total = len(products)
-            products = products[offset:offset + limit]
+            page = product_service.get_products_page(limit, offset, category=category, search=search,
+                                                     total=total)
+            total = page['total']
             
-            return jsonify({
+            return with_validators(jsonify({
                 'success': True,
-                'data': products,
+                'data': page['products'],
                 'pagination': {
                     'total': total,
                     'limit': limit,
                     'offset': offset,
                     'has_more': offset + limit < total
                 }
-            }), 200
+            }), etag), 200
         
-        return jsonify({
+        products = product_service.get_all_products(category=category, search=search)
+        
+        return with_validators(jsonify({
             'success': True,
             'data': products,
             'total': len(products)
-        }), 200
+        }), etag), 200
         
     except Exception as e:
         return jsonify({
@@ -64,13 +146,22 @@ def get_product_detail(product_id: int):
     Get detailed information about a specific product.
     """
     try:
+        validators = product_service.get_product_etag(product_id)
+        if validators:
+            cached = not_modified(*validators)
+            if cached:
+                return cached
+        
         product = product_service.get_product_detail(product_id)
         
         if product:
-            return jsonify({
+            response = jsonify({
                 'success': True,
                 'data': product
-            }), 200
+            })
+            if validators:
+                with_validators(response, *validators)
+            return response, 200
         else:
             return jsonify({
                 'success': False,
@@ -118,14 +209,21 @@ def check_product_availability(product_id: int):
 def get_categories():
     """
     Get all product categories.
+    The response also includes the number of active products per category.
     """
     try:
-        categories = product_service.get_product_categories()
+        etag = product_service.get_categories_etag()
+        cached = not_modified(etag)
+        if cached:
+            return cached
         
-        return jsonify({
+        summary = product_service.get_category_summary()
+        
+        return with_validators(jsonify({
             'success': True,
-            'data': categories
-        }), 200
+            'data': [category['name'] for category in summary],
+            'categories': summary
+        }), etag), 200
         
     except Exception as e:
         return jsonify({
@@ -135,14 +233,21 @@ def get_categories():
 
 
 @product_bp.route('/search', methods=['GET'])
+@rate_limited('search')
 def search_products():
     """
-    Search products by query.
+    Search products by query, best matches first.
     Query parameters:
     - q: Search query (required)
+    - category: Filter by category
+    - limit: Limit number of results (default: 20, max: 100)
+    - offset: Offset for pagination
     """
     try:
         query = request.args.get('q')
+        category = request.args.get('category')
+        limit = request.args.get('limit', type=int, default=DEFAULT_PAGE_LIMIT)
+        offset = request.args.get('offset', type=int, default=0)
         
         if not query:
             return jsonify({
@@ -150,13 +255,27 @@ def search_products():
                 'message': 'Search query is required'
             }), 400
         
-        products = product_service.search_products(query)
+        if limit <= 0 or offset < 0:
+            return jsonify({
+                'success': False,
+                'message': 'limit must be greater than 0 and offset non-negative'
+            }), 400
+        
+        limit = min(limit, MAX_PAGE_LIMIT)
+        results = product_service.search_products(query, limit, offset, category=category)
+        total = results['total']
         
         return jsonify({
             'success': True,
-            'data': products,
-            'total': len(products),
-            'query': query
+            'data': results['products'],
+            'total': total,
+            'query': query,
+            'pagination': {
+                'total': total,
+                'limit': limit,
+                'offset': offset,
+                'has_more': offset + limit < total
+            }
         }), 200
         
     except Exception as e:
@@ -166,6 +285,145 @@ def search_products():
         }), 500
 
 
+@product_bp.route('/export', methods=['GET'])
+@rate_limited('export')
+def export_products():
+    """
+    Export active products as a download, streamed as rows are read.
+    Query parameters:
+    - format: 'ndjson' (default, one product per line) or 'json' (array)
+    - category: Filter by category
+    - search: Search in name and description
+    Products are sorted by ID; memory use does not grow with the catalog.
+    """
+    try:
+        feed_type = request.args.get('format', 'ndjson').lower()
+        if feed_type not in EXPORT_FORMATS:
+            return jsonify({
+                'success': False,
+                'message': f'format must be one of: {", ".join(EXPORT_FORMATS)}'
+            }), 400
+        
+        mimetype, extension = EXPORT_FORMATS[feed_type]
+        products = product_service.iter_products(
+            category=request.args.get('category'),
+            search=request.args.get('search')
+        )
+        body = iter_json_lines(products) if feed_type == 'ndjson' else iter_json_array(products)
+        
+        response = Response(stream_with_context(body), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="products.{extension}"'
+        return response, 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error exporting products: {str(e)}'
+        }), 500
+
+
+@product_bp.route('/import', methods=['POST'])
+def import_products():
+    """
+    Create products from an NDJSON or CSV feed streamed in the request body.
+    Requires a bearer token of an admin user.
+    Query parameters:
+    - format: 'ndjson' or 'csv' (default: from the Content-Type header)
+    Each row/line needs name, description, price, stock and category;
+    image_url and is_active are optional. Invalid rows are reported by line
+    number and skipped; valid rows are imported in batches as they arrive.
+    """
+    try:
+        denied = _require_admin('import products')
+        if denied:
+            return denied
+        
+        feed_type = feed_format(request.args.get('format') or request.mimetype)
+        if feed_type is None:
+            return jsonify({
+                'success': False,
+                'message': 'Send the feed as application/x-ndjson or text/csv, or pass format=ndjson|csv'
+            }), 415
+        
+        # Decode the body as it is read instead of buffering it
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='' if feed_type == 'csv' else None)
+        try:
+            result = product_service.import_products(read_feed(stream, feed_type))
+        except UnicodeDecodeError:
+            return jsonify({
+                'success': False,
+                'message': 'Feed must be UTF-8 encoded; rows before the invalid bytes may have been imported'
+            }), 400
+        
+        return jsonify(result), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error importing products: {str(e)}'
+        }), 500
+
+
+@product_bp.route('/sync', methods=['POST'])
+def sync_products():
+    """
+    Apply a batch of price/stock/active-flag changes from an ERP.
+    Requires a bearer token of an admin user.
+    Request body:
+    {
+        "updates": [
+            {"id": 1, "price": 19.99, "stock": 40, "is_active": true}
+        ]
+    }
+    Every field but id is optional; stock is the new absolute level. Returns
+    a status per ID: updated, unchanged, not_found or invalid.
+    """
+    try:
+        denied = _require_admin('sync products')
+        if denied:
+            return denied
+        
+        data = request.get_json()
+        updates = data.get('updates') if isinstance(data, dict) else None
+        
+        if not isinstance(updates, list):
+            return jsonify({
+                'success': False,
+                'message': 'updates must be a list'
+            }), 400
+        
+        if len(updates) > MAX_SYNC_UPDATES:
+            return jsonify({
+                'success': False,
+                'message': f'At most {MAX_SYNC_UPDATES} updates per request'
+            }), 400
+        
+        result = product_service.sync_products(updates)
+        
+        return jsonify(result), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error syncing products: {str(e)}'
+        }), 500
+
+
+def _require_admin(action: str):
+    """Return a 401/403 response unless the caller is an admin user, else None."""
+    if g.current_user_id is None:
+        return jsonify({
+            'success': False,
+            'message': f'Authentication required to {action}'
+        }), 401
+    if not user_service.is_admin(g.current_user_id):
+        return jsonify({
+            'success': False,
+            'message': f'Admin privileges required to {action}'
+        }), 403
+    return None
+
+
 # Error handlers for the blueprint
 @product_bp.errorhandler(404)
 def not_found(error):
@@ -1,16 +1,20 @@
 from flask import Blueprint, request, jsonify
 from services.user_service import UserService
 from repositories.user_repository import UserRepository
+from utils.instrumentation import TimedService
+from utils.passwords import PasswordHasherBusy
+from utils.rate_limit import rate_limited
 
 # Create blueprint
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
 # Initialize dependencies
 user_repository = UserRepository()
-user_service = UserService(user_repository)
+user_service = TimedService(UserService(user_repository))
 
 
 @auth_bp.route('/signup', methods=['POST'])
+@rate_limited('auth')
 def signup():
     """
     User signup.
@@ -27,11 +31,14 @@ def signup():
         status_code = 201 if result['success'] else 400
         return jsonify(result), status_code
 
+    except PasswordHasherBusy:
+        return _busy_response()
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error during signup: {str(e)}'}), 500
 
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limited('auth')
 def login():
     """
     User login.
@@ -48,5 +55,14 @@ def login():
         status_code = 200 if result.get('token') else 401
         return jsonify(result), status_code
 
+    except PasswordHasherBusy:
+        return _busy_response()
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error during login: {str(e)}'}), 500
+
+
+def _busy_response():
+    # Password hashing is saturated: fail fast and let the client retry
+    response = jsonify({'success': False, 'message': 'Authentication is busy, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
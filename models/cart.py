@@ -1,25 +1,43 @@
 from .database import db
+from datetime import datetime
 from decimal import Decimal
 
 class Cart(db.Model):
     """Cart model representing a shopping cart."""
     id = db.Column(db.String(36), primary_key=True)
-    user_id = db.Column(db.String(36), nullable=True)
-    items = db.relationship('CartItem', backref='cart', lazy=True, cascade="all, delete-orphan")
+    user_id = db.Column(db.String(36), nullable=True, index=True)
+    # Incremented whenever the cart's lines change (see CartRepository)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Ordered by id so lines keep insertion order whichever index the database scans
+    items = db.relationship('CartItem', backref='cart', lazy=True, cascade="all, delete-orphan",
+                            order_by='CartItem.id')
 
-    def to_dict(self) -> dict:
-        """Convert cart to dictionary for JSON serialization."""
+    def to_dict(self, fragments: bool = False) -> dict:
+        """Convert cart to dictionary for JSON serialization.
+        
+        With `fragments`, products are embedded as cached JSON fragments, which
+        only the app's JSON provider can encode.
+        """
+        items = []
+        total = Decimal('0')
+        item_count = 0
+        for item in self.items:
+            item_dict = item.to_dict(fragments)
+            items.append(item_dict)
+            total += item.get_subtotal()
+            item_count += item.quantity
         return {
             'id': self.id,
             'user_id': self.user_id,
-            'items': [item.to_dict() for item in self.items],
-            'total': float(self.get_total()),
-            'item_count': self.get_item_count()
+            'items': items,
+            'total': float(total),
+            'item_count': item_count
         }
 
     def get_total(self) -> Decimal:
         """Calculate total amount of the cart."""
-        return sum(item.get_subtotal() for item in self.items)
+        return sum((item.get_subtotal() for item in self.items), Decimal('0'))
 
     def get_item_count(self) -> int:
         """Get total number of items in the cart."""
@@ -34,14 +52,21 @@ class CartItem(db.Model):
 
     product = db.relationship('Product')
 
+    __table_args__ = (
+        # One line per product; adds go through an upsert on this key (see CartRepository).
+        # Its leading column also serves every lookup by cart_id.
+        db.Index('uq_cart_item_cart_product', 'cart_id', 'product_id', unique=True),
+        db.Index('ix_cart_item_product_id', 'product_id'),
+    )
+
     def get_subtotal(self) -> Decimal:
         """Calculate subtotal for this cart item."""
         return self.product.price * self.quantity
 
-    def to_dict(self) -> dict:
+    def to_dict(self, fragments: bool = False) -> dict:
         """Convert cart item to dictionary for JSON serialization."""
         return {
-            'product': self.product.to_dict(),
+            'product': self.product.to_fragment() if fragments else self.product.to_dict(),
             'quantity': self.quantity,
             'subtotal': float(self.get_subtotal())
         }
\ No newline at end of file
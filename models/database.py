@@ -1,3 +1,117 @@
+from typing import Any, Dict, Mapping
+import threading
+import time
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, exc
+from sqlalchemy.pool import NullPool, QueuePool
 
 db = SQLAlchemy()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_time_total += waited
+                self.wait_time_max = max(self.wait_time_max, waited)
+
+
+def _env_flag(environ: Mapping[str, str], name: str, default: bool) -> bool:
+    value = environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def engine_options(database_uri: str, environ: Mapping[str, str]) -> Dict[str, Any]:
+    """Build SQLALCHEMY_ENGINE_OPTIONS from DB_* environment variables.
+
+    SQLite keeps SQLAlchemy's default pool; pool settings only apply to
+    server databases. With DB_PGBOUNCER=1 the app keeps no pool of its own
+    (PgBouncer in transaction mode does the pooling).
+    """
+    if not database_uri or database_uri.startswith('sqlite'):
+        return {}
+
+    if _env_flag(environ, 'DB_PGBOUNCER', False):
+        return {'poolclass': NullPool}
+
+    options: Dict[str, Any] = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': _env_flag(environ, 'DB_POOL_PRE_PING', True),
+    }
+    statement_timeout = int(environ.get('DB_STATEMENT_TIMEOUT_MS', 0))
+    if statement_timeout and database_uri.startswith('postgresql'):
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
+def pool_capacity(options: Mapping[str, Any]) -> int:
+    """Most connections a pool built from `engine_options` can hand out (0 = unbounded)."""
+    if options.get('poolclass') is not InstrumentedQueuePool:
+        return 0
+    return options['pool_size'] + max(options['max_overflow'], 0)
+
+
+def configure_engine(engine, environ: Mapping[str, str]) -> None:
+    """Install per-transaction settings that cannot go in the connect string.
+
+    PgBouncer in transaction mode drops startup parameters and shares server
+    sessions, so the statement timeout is applied with SET LOCAL on every
+    transaction instead.
+    """
+    statement_timeout = int(environ.get('DB_STATEMENT_TIMEOUT_MS', 0))
+    if not (statement_timeout and engine.dialect.name == 'postgresql'
+            and _env_flag(environ, 'DB_PGBOUNCER', False)):
+        return
+
+    @event.listens_for(engine, 'begin')
+    def _set_statement_timeout(connection):
+        connection.exec_driver_sql(f'SET LOCAL statement_timeout = {statement_timeout}')
+
+
+def pool_stats(engine) -> Dict[str, Any]:
+    """Get connection pool occupancy and wait-time statistics for an engine."""
+    pool = engine.pool
+    stats: Dict[str, Any] = {'pool': type(pool).__name__, 'status': pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': pool.overflow(),
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            checkouts = pool.checkouts
+            stats.update({
+                'checkouts': checkouts,
+                'timeouts': pool.timeouts,
+                'wait_ms_total': round(pool.wait_time_total * 1000, 3),
+                'wait_ms_avg': round(pool.wait_time_total * 1000 / checkouts, 3) if checkouts else 0.0,
+                'wait_ms_max': round(pool.wait_time_max * 1000, 3),
+            })
+    return stats
@@ -0,0 +1,66 @@
+from .database import db
+from datetime import datetime
+from decimal import Decimal
+
+# Order lifecycle: a checkout creates a 'reserved' order that holds stock until
+# `expires_at`; payment confirmation turns it into 'placed', while cancelling or
+# expiry returns the stock and ends in 'released' or 'expired'.
+ORDER_RESERVED = 'reserved'
+ORDER_PLACED = 'placed'
+ORDER_RELEASED = 'released'
+ORDER_EXPIRED = 'expired'
+
+
+class Order(db.Model):
+    """Order model; while reserved it holds the stock of its items."""
+    id = db.Column(db.String(36), primary_key=True)
+    cart_id = db.Column(db.String(36), nullable=False)
+    user_id = db.Column(db.String(36), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default=ORDER_RESERVED)
+    total = db.Column(db.Numeric(12, 2), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    items = db.relationship('OrderItem', backref='order', lazy=True, cascade="all, delete-orphan")
+
+    __table_args__ = (
+        db.Index('ix_order_status_expires_at', 'status', 'expires_at'),
+        # Finds the live reservation of a cart so a repeated checkout reuses it
+        db.Index('ix_order_cart_id_status', 'cart_id', 'status'),
+    )
+
+    def to_dict(self) -> dict:
+        """Convert order to dictionary for JSON serialization."""
+        return {
+            'id': self.id,
+            'cart_id': self.cart_id,
+            'user_id': self.user_id,
+            'status': self.status,
+            'items': [item.to_dict() for item in self.items],
+            'total': float(self.total),
+            'created_at': self.created_at.isoformat() + 'Z',
+            'expires_at': self.expires_at.isoformat() + 'Z'
+        }
+
+
+class OrderItem(db.Model):
+    """Order line with the product price captured at checkout."""
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.String(36), db.ForeignKey('order.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    product_name = db.Column(db.String(100), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    unit_price = db.Column(db.Numeric(10, 2), nullable=False)
+
+    def get_subtotal(self) -> Decimal:
+        """Calculate subtotal for this order line."""
+        return self.unit_price * self.quantity
+
+    def to_dict(self) -> dict:
+        """Convert order item to dictionary for JSON serialization."""
+        return {
+            'product_id': self.product_id,
+            'product_name': self.product_name,
+            'quantity': self.quantity,
+            'unit_price': float(self.unit_price),
+            'subtotal': float(self.get_subtotal())
+        }
@@ -1,5 +1,8 @@
 from .database import db
+from datetime import datetime
 from decimal import Decimal
+from sqlalchemy import event, text
+from utils.serialization import JSONFragment, product_fragment
 
 class Product(db.Model):
     """Product model representing a product in the system."""
@@ -11,6 +14,19 @@ class Product(db.Model):
     category = db.Column(db.String(50), nullable=False)
     image_url = db.Column(db.String(200), nullable=True)
     is_active = db.Column(db.Boolean, default=True)
+    # Incremented on every change; keys cached serializations of the row
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Every catalog read filters on is_active = true, so the indexes only cover
+    # active rows: (category, id) serves category listings and counts, (id)
+    # serves the unfiltered listing, keyset pages and counts.
+    __table_args__ = (
+        db.Index('ix_product_active_category', 'category', 'id',
+                 postgresql_where=text('is_active'), sqlite_where=text('is_active = 1')),
+        db.Index('ix_product_active_id', 'id',
+                 postgresql_where=text('is_active'), sqlite_where=text('is_active = 1')),
+    )
 
     def to_dict(self) -> dict:
         """Convert product to dictionary for JSON serialization."""
@@ -25,6 +41,10 @@ class Product(db.Model):
             'is_active': self.is_active
         }
 
+    def to_fragment(self) -> JSONFragment:
+        """Get the pre-encoded JSON of `to_dict()`, cached by row version."""
+        return product_fragment(self)
+
     @staticmethod
     def from_dict(data: dict) -> 'Product':
         """Create Product instance from dictionary."""
@@ -36,4 +56,10 @@ class Product(db.Model):
             category=data['category'],
             image_url=data.get('image_url'),
             is_active=data.get('is_active', True)
-        )
\ No newline at end of file
+        )
+
+
+@event.listens_for(Product, 'before_update')
+def _bump_product_version(mapper, connection, target: Product) -> None:
+    """Give every ORM update of a product a new row version."""
+    target.version = (target.version or 0) + 1
@@ -0,0 +1,55 @@
+from sqlalchemy import inspect, text
+from .database import db
+
+# Columns added after the first release: (table, column, DDL column definition).
+# `db.create_all()` only creates missing tables, so existing databases get these
+# through `upgrade_schema()`.
+ADDED_COLUMNS = [
+    ('product', 'version', 'INTEGER NOT NULL DEFAULT 1'),
+    ('product', 'updated_at', 'TIMESTAMP'),
+    ('cart', 'version', 'INTEGER NOT NULL DEFAULT 1'),
+    ('cart', 'updated_at', 'TIMESTAMP'),
+    ('user', 'is_admin', 'BOOLEAN NOT NULL DEFAULT FALSE'),
+]
+
+# Statements that must run before an index can be created on existing data.
+INDEX_PREPARATION = {
+    # Merge duplicate cart lines into the oldest one before enforcing uniqueness
+    'uq_cart_item_cart_product': [
+        """UPDATE cart_item SET quantity = (
+               SELECT SUM(duplicate.quantity) FROM cart_item AS duplicate
+               WHERE duplicate.cart_id = cart_item.cart_id AND duplicate.product_id = cart_item.product_id)
+           WHERE id IN (SELECT MIN(id) FROM cart_item GROUP BY cart_id, product_id HAVING COUNT(*) > 1)""",
+        """DELETE FROM cart_item
+           WHERE id NOT IN (SELECT MIN(id) FROM cart_item GROUP BY cart_id, product_id)""",
+    ],
+}
+
+
+def upgrade_schema() -> None:
+    """Add missing `ADDED_COLUMNS` and any index declared on the models but missing.
+
+    `db.create_all()` does not add indexes to tables that already exist.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    with db.engine.begin() as connection:
+        for table, column, definition in ADDED_COLUMNS:
+            if table not in existing_tables:
+                continue
+            columns = {info['name'] for info in inspector.get_columns(table)}
+            if column not in columns:
+                # "user" is a reserved word in PostgreSQL
+                quoted = connection.dialect.identifier_preparer.quote(table)
+                connection.execute(text(f'ALTER TABLE {quoted} ADD COLUMN {column} {definition}'))
+        
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            indexes = {info['name'] for info in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in indexes:
+                    continue
+                for statement in INDEX_PREPARATION.get(index.name, []):
+                    connection.execute(text(statement))
+                index.create(connection)
@@ -1,14 +1,21 @@
 from .database import db
-import bcrypt
+from utils.passwords import password_hasher
 
 class User(db.Model):
     """User model for authentication."""
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
+    # Catalog writes (bulk import and ERP sync); granted with `flask grant-admin`
+    is_admin = db.Column(db.Boolean, nullable=False, default=False)
 
     def set_password(self, password):
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        # Hashing runs on the bounded password pool; may raise PasswordHasherBusy
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return password_hasher.verify(password, self.password_hash)
+
+    def password_needs_rehash(self):
+        """Whether the stored hash uses a different bcrypt cost than configured."""
+        return password_hasher.needs_rehash(self.password_hash)
@@ -1,10 +1,19 @@
-from typing import Optional
+from typing import Any, Dict, List, Optional
+from datetime import datetime
 import uuid
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import joinedload, selectinload
 from models.cart import Cart, CartItem
+from models.product import Product
 from models.database import db
 
 class CartRepository:
-    """Repository for managing cart data access."""
+    """Repository for managing cart data access.
+    
+    Every method that changes a cart's lines also bumps `Cart.version` in the
+    same transaction, which is what cart ETags are computed from.
+    """
     
     def create_cart(self, user_id: Optional[str] = None) -> Cart:
         """Create a new cart."""
@@ -14,13 +23,27 @@ class CartRepository:
         db.session.commit()
         return cart
     
+    def _cart_query(self):
+        """Base query that loads a cart with its items and their products.
+
+        Items are fetched with a second SELECT ... IN and products are joined
+        onto that statement, so a cart costs two queries regardless of size.
+        """
+        return Cart.query.options(
+            selectinload(Cart.items).joinedload(CartItem.product)
+        ).execution_options(populate_existing=True)
+    
     def get_cart_by_id(self, cart_id: str) -> Optional[Cart]:
         """Get a cart by its ID."""
-        return Cart.query.get(cart_id)
+        return self._cart_query().filter_by(id=cart_id).first()
+    
+    def get_cart_owner(self, cart_id: str) -> Optional[str]:
+        """Get the user ID a cart belongs to; None for anonymous or missing carts."""
+        return db.session.scalar(select(Cart.user_id).where(Cart.id == cart_id))
     
     def get_cart_by_user_id(self, user_id: str) -> Optional[Cart]:
         """Get a cart by user ID."""
-        return Cart.query.filter_by(user_id=user_id).first()
+        return self._cart_query().filter_by(user_id=user_id).first()
     
     def delete_cart(self, cart_id: str) -> bool:
         """Delete a cart."""
@@ -45,37 +68,96 @@ class CartRepository:
         
         return self.create_cart(user_id)
     
+    def get_cart_state(self, cart_id: str) -> Optional[Dict[str, Any]]:
+        """Get the version data of a cart and its products without loading them.
+        
+        Product versions only grow and line changes bump the cart version, so
+        the sum of product versions identifies the state of a fixed set of lines.
+        """
+        row = db.session.query(
+            Cart.version,
+            Cart.updated_at,
+            func.count(CartItem.id),
+            func.coalesce(func.sum(Product.version), 0),
+            func.max(Product.updated_at)
+        ).outerjoin(CartItem, CartItem.cart_id == Cart.id) \
+            .outerjoin(Product, Product.id == CartItem.product_id) \
+            .filter(Cart.id == cart_id) \
+            .group_by(Cart.id, Cart.version, Cart.updated_at) \
+            .first()
+        if row is None:
+            return None
+        cart_version, cart_updated_at, line_count, product_versions, products_updated_at = row
+        timestamps = [value for value in (cart_updated_at, products_updated_at) if value is not None]
+        return {
+            'version': (cart_version, line_count, int(product_versions)),
+            'last_modified': max(timestamps) if timestamps else None
+        }
+    
+    def _touch_cart(self, cart_id: str) -> bool:
+        """Bump a cart's version in the current transaction; False if it does not exist."""
+        updated = Cart.query.filter_by(id=cart_id).update(
+            {Cart.version: Cart.version + 1, Cart.updated_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        return updated > 0
+    
     def clear_cart(self, cart_id: str) -> bool:
         """Clear all items from a cart."""
-        cart = self.get_cart_by_id(cart_id)
-        if cart:
-            for item in cart.items:
-                db.session.delete(item)
-            db.session.commit()
-            return True
-        return False
+        if not self._touch_cart(cart_id):
+            db.session.rollback()
+            return False
+        CartItem.query.filter_by(cart_id=cart_id).delete(synchronize_session=False)
+        db.session.commit()
+        return True
 
     def add_item_to_cart(self, cart_id: str, product_id: int, quantity: int) -> Optional[Cart]:
         """Add an item to a cart or update its quantity."""
-        cart = self.get_cart_by_id(cart_id)
-        if not cart:
+        if not self._touch_cart(cart_id):
+            db.session.rollback()
             return None
 
-        item = CartItem.query.filter_by(cart_id=cart_id, product_id=product_id).first()
-        if item:
-            item.quantity += quantity
-        else:
-            item = CartItem(cart_id=cart_id, product_id=product_id, quantity=quantity)
-            db.session.add(item)
-        
+        self._upsert_items(cart_id, {product_id: quantity})
         db.session.commit()
-        return cart
+        return self.get_cart_by_id(cart_id)
+
+    def _upsert_items(self, cart_id: str, quantities: Dict[int, int]) -> None:
+        """Insert cart lines, adding to the quantity of lines that already exist.
+        
+        One INSERT ... ON CONFLICT (cart_id, product_id) DO UPDATE on PostgreSQL
+        and SQLite, so concurrent adds of the same product neither lose
+        increments nor create duplicate lines.
+        """
+        rows = [
+            {'cart_id': cart_id, 'product_id': product_id, 'quantity': quantity}
+            for product_id, quantity in quantities.items()
+        ]
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            statement = insert(CartItem.__table__).values(rows)
+            statement = statement.on_conflict_do_update(
+                index_elements=['cart_id', 'product_id'],
+                set_={'quantity': CartItem.__table__.c.quantity + statement.excluded.quantity}
+            )
+            db.session.execute(statement)
+            return
+
+        # Other databases: increment in place, insert when no line exists yet
+        for row in rows:
+            updated = CartItem.query.filter_by(cart_id=cart_id, product_id=row['product_id']).update(
+                {CartItem.quantity: CartItem.quantity + row['quantity']}, synchronize_session=False
+            )
+            if not updated:
+                db.session.add(CartItem(**row))
+        db.session.flush()
 
     def remove_item_from_cart(self, cart_id: str, product_id: int) -> bool:
         """Remove an item from a cart."""
         item = CartItem.query.filter_by(cart_id=cart_id, product_id=product_id).first()
         if item:
             db.session.delete(item)
+            self._touch_cart(cart_id)
             db.session.commit()
             return True
         return False
@@ -87,6 +169,97 @@ class CartRepository:
             if quantity <= 0:
                 return self.remove_item_from_cart(cart_id, product_id)
             item.quantity = quantity
+            self._touch_cart(cart_id)
             db.session.commit()
             return True
-        return False
\ No newline at end of file
+        return False
+
+    def apply_item_operations(self, cart_id: str, operations: List[Dict[str, Any]]) -> Optional[List[bool]]:
+        """Apply add/update/remove operations to a cart in one transaction.
+        
+        Operations are dicts with `op`, `product_id` and `quantity`, applied in
+        order. Returns whether each one applied (updating or removing a product
+        that is not in the cart does not), or None if the cart does not exist.
+        """
+        if not self._touch_cart(cart_id):
+            db.session.rollback()
+            return None
+
+        touched = {operation['product_id'] for operation in operations}
+        items = {
+            item.product_id: item
+            for item in CartItem.query.filter(CartItem.cart_id == cart_id, CartItem.product_id.in_(touched))
+        }
+        quantities = {product_id: item.quantity for product_id, item in items.items()}
+        applied = []
+        for operation in operations:
+            product_id = operation['product_id']
+            current = quantities.get(product_id, 0)
+            if operation['op'] == 'add':
+                quantities[product_id] = current + operation['quantity']
+            elif current <= 0:
+                applied.append(False)
+                continue
+            elif operation['op'] == 'update':
+                quantities[product_id] = operation['quantity']
+            else:
+                quantities[product_id] = 0
+            applied.append(True)
+
+        # Write only the final state of each line; new lines are upserted in
+        # case a concurrent request inserted the same product meanwhile
+        new_lines = {}
+        for product_id, quantity in quantities.items():
+            item = items.get(product_id)
+            if item is None:
+                if quantity > 0:
+                    new_lines[product_id] = quantity
+            elif quantity <= 0:
+                db.session.delete(item)
+            elif item.quantity != quantity:
+                item.quantity = quantity
+        db.session.flush()
+        if new_lines:
+            self._upsert_items(cart_id, new_lines)
+        
+        db.session.commit()
+        return applied
+
+    def get_item_counts(self, cart_ids: List[str], user_id: Optional[str] = None) -> Dict[str, int]:
+        """Get the number of lines in each existing cart, keyed by cart ID.
+        
+        Only anonymous carts and those of `user_id` are counted; carts of other
+        users are left out as if they did not exist.
+        """
+        rows = db.session.query(Cart.id, func.count(CartItem.id)) \
+            .outerjoin(CartItem, CartItem.cart_id == Cart.id) \
+            .filter(Cart.id.in_(cart_ids), or_(Cart.user_id.is_(None), Cart.user_id == user_id)) \
+            .group_by(Cart.id) \
+            .all()
+        return {cart_id: count for cart_id, count in rows}
+
+    def get_checkout_issues(self, cart_ids: List[str]) -> List[dict]:
+        """Get every inactive or short-stock line of the given carts in one query."""
+        rows = db.session.query(
+            CartItem.cart_id,
+            CartItem.product_id,
+            CartItem.quantity,
+            Product.name,
+            Product.stock,
+            Product.is_active
+        ).join(Product, CartItem.product_id == Product.id) \
+            .filter(CartItem.cart_id.in_(cart_ids)) \
+            .filter(Product.is_active.is_not(True) | (Product.stock < CartItem.quantity)) \
+            .order_by(CartItem.cart_id, CartItem.id) \
+            .all()
+        return [
+            {
+                'cart_id': row.cart_id,
+                'product_id': row.product_id,
+                'product_name': row.name,
+                'quantity': row.quantity,
+                'stock': row.stock,
+                'is_active': bool(row.is_active)
+            }
+            for row in rows
+        ]
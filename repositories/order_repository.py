@@ -0,0 +1,196 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import uuid
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import selectinload
+from models.cart import Cart, CartItem
+from models.order import Order, OrderItem, ORDER_RESERVED, ORDER_PLACED, ORDER_RELEASED, ORDER_EXPIRED
+from models.database import db
+from repositories.product_repository import ProductRepository
+
+
+class OrderRepository:
+    """Repository for orders and the stock they hold while reserved.
+
+    Stock is taken with one conditional bulk UPDATE on the product rows and
+    every status change is a conditional UPDATE on the order row, so no row
+    locks are held across statements and a reservation can only be placed,
+    cancelled or expired once.
+    """
+
+    def __init__(self, product_repository: Optional[ProductRepository] = None):
+        self.product_repository = product_repository or ProductRepository()
+
+    def get_order_by_id(self, order_id: str) -> Optional[Order]:
+        """Get an order with its items."""
+        return Order.query.options(selectinload(Order.items)).filter_by(id=order_id).first()
+
+    def get_order_owner(self, order_id: str) -> Optional[str]:
+        """Get the user ID an order belongs to; None for anonymous or missing orders."""
+        return db.session.scalar(select(Order.user_id).where(Order.id == order_id))
+
+    def get_live_reservation(self, cart_id: str) -> Optional[Order]:
+        """Get the newest unexpired reserved order of a cart, with its items."""
+        return (
+            Order.query.options(selectinload(Order.items))
+            .filter(Order.cart_id == cart_id,
+                    Order.status == ORDER_RESERVED,
+                    Order.expires_at > datetime.utcnow())
+            .order_by(Order.created_at.desc())
+            .first()
+        )
+
+    def reserve_cart(self, cart: Cart, ttl_seconds: int) -> Tuple[Optional[Order], List[int]]:
+        """Reserve the stock of every cart line and record it as a reserved order.
+
+        All lines are taken in one transaction: either every product has the
+        stock or nothing changes. Returns the order, or None and the product
+        IDs that could not be reserved. None with no product IDs means the
+        cart changed since it was loaded, e.g. a concurrent checkout of it.
+        """
+        now = datetime.utcnow()
+        # Claim the cart version first: of two checkouts of the same cart
+        # only one matches it, the other waits for its commit and gets 0 rows
+        claimed = db.session.execute(
+            update(Cart)
+            .where(Cart.id == cart.id, Cart.version == cart.version)
+            .values(version=Cart.version + 1, updated_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not claimed:
+            db.session.rollback()
+            return None, []
+        order = Order(
+            id=str(uuid.uuid4()),
+            cart_id=cart.id,
+            user_id=cart.user_id,
+            status=ORDER_RESERVED,
+            total=cart.get_total(),
+            created_at=now,
+            expires_at=now + timedelta(seconds=ttl_seconds)
+        )
+        lines = []
+        quantities: Dict[int, int] = {}
+        for item in cart.items:
+            lines.append({
+                'order_id': order.id,
+                'product_id': item.product_id,
+                'product_name': item.product.name,
+                'quantity': item.quantity,
+                'unit_price': item.product.price
+            })
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+
+        # Insert first and decrement last so product rows stay locked only
+        # between the stock UPDATE and the commit. Lines go in as one
+        # executemany; flushing them as objects costs a statement per line.
+        db.session.add(order)
+        db.session.flush()
+        if lines:
+            db.session.execute(insert(OrderItem), lines)
+        failed, categories = self.product_repository.apply_stock_changes(
+            {product_id: -quantity for product_id, quantity in quantities.items()}
+        )
+        if failed:
+            db.session.rollback()
+            return None, failed
+        db.session.commit()
+        self.product_repository.invalidate(quantities, categories)
+        return order, []
+
+    def place_order(self, order_id: str) -> bool:
+        """Turn an unexpired reservation into a placed order.
+
+        Only the quantities the order covers leave the cart; lines added or
+        raised after the reservation stay in it.
+        """
+        now = datetime.utcnow()
+        row = db.session.execute(
+            update(Order)
+            .where(Order.id == order_id,
+                   Order.status == ORDER_RESERVED,
+                   Order.expires_at > now)
+            .values(status=ORDER_PLACED)
+            .returning(Order.cart_id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if row is None:
+            db.session.rollback()
+            return False
+        ordered = (
+            select(func.sum(OrderItem.quantity))
+            .where(OrderItem.order_id == order_id, OrderItem.product_id == CartItem.product_id)
+            .scalar_subquery()
+        )
+        # Lines with no order item compare against NULL and are left alone
+        CartItem.query.filter(
+            CartItem.cart_id == row.cart_id, CartItem.quantity <= ordered
+        ).delete(synchronize_session=False)
+        CartItem.query.filter(
+            CartItem.cart_id == row.cart_id,
+            CartItem.product_id.in_(select(OrderItem.product_id).where(OrderItem.order_id == order_id))
+        ).update({CartItem.quantity: CartItem.quantity - ordered}, synchronize_session=False)
+        Cart.query.filter_by(id=row.cart_id).update(
+            {Cart.version: Cart.version + 1, Cart.updated_at: now},
+            synchronize_session=False
+        )
+        db.session.commit()
+        return True
+
+    def release_reservation(self, order_id: str) -> bool:
+        """Cancel a reservation and return its stock; False if it is no longer reserved."""
+        return self._release([order_id], ORDER_RELEASED) > 0
+
+    def release_expired_reservations(self, batch_size: int = 500,
+                                     product_ids: Optional[List[int]] = None) -> int:
+        """Return the stock of up to `batch_size` expired reservations.
+
+        Call repeatedly until it returns 0. With `product_ids`, only
+        reservations holding one of those products are released. On
+        PostgreSQL rows already being released by another worker are skipped
+        instead of waited on.
+        """
+        query = select(Order.id).where(Order.status == ORDER_RESERVED, Order.expires_at <= datetime.utcnow())
+        if product_ids:
+            query = query.where(
+                select(OrderItem.id)
+                .where(OrderItem.order_id == Order.id, OrderItem.product_id.in_(product_ids))
+                .exists()
+            )
+        order_ids = db.session.scalars(
+            query
+            .order_by(Order.expires_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not order_ids:
+            db.session.rollback()
+            return 0
+        return self._release(order_ids, ORDER_EXPIRED)
+
+    def _release(self, order_ids: List[str], status: str) -> int:
+        # Only orders this statement moves out of 'reserved' give stock back,
+        # so a reservation racing with place_order is never returned twice
+        released = db.session.scalars(
+            update(Order)
+            .where(Order.id.in_(order_ids), Order.status == ORDER_RESERVED)
+            .values(status=status)
+            .returning(Order.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not released:
+            db.session.rollback()
+            return 0
+
+        quantities = dict(db.session.execute(
+            select(OrderItem.product_id, func.sum(OrderItem.quantity))
+            .where(OrderItem.order_id.in_(released))
+            .group_by(OrderItem.product_id)
+        ).all())
+        _, categories = self.product_repository.apply_stock_changes(
+            {product_id: int(quantity) for product_id, quantity in quantities.items()},
+            require_active=False
+        )
+        db.session.commit()
+        self.product_repository.invalidate(quantities, categories)
+        return len(released)
@@ -1,71 +1,419 @@
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime
 from decimal import Decimal
+from sqlalchemy import Boolean, DateTime, Integer, Numeric, bindparam, case, func, insert, select, text, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.sql.elements import TextClause
 from models.product import Product
 from models.database import db
+from utils.cache import LRUCache, NullCache
+from repositories.product_search import ProductSearchBackend, get_search_backend
+
+# Product cache shared by every repository instance in the process;
+# create_app sizes it from PRODUCT_CACHE_SIZE / PRODUCT_CACHE_TTL. It is not
+# shared between Gunicorn workers: `invalidate` only clears this process, so
+# after a write the other workers may serve their copy for up to the TTL.
+product_cache = LRUCache(max_size=1024, ttl=5)
+
+_CATEGORY_COUNTS_KEY = ('category_counts',)
+
+# Rows fetched per round trip when streaming a listing
+STREAM_BATCH_SIZE = 1000
+
+# Product deltas per UPDATE statement (4 bound parameters each)
+DELTA_CHUNK_SIZE = 500
+
+
+def _delta_update(chunk: List[Dict[str, Any]]) -> TextClause:
+    """Build the set-based UPDATE for a chunk of product deltas.
+
+    Written as WITH delta(...) AS (VALUES ...) UPDATE ... FROM delta because
+    SQLite does not accept column names on a VALUES alias; PostgreSQL and
+    SQLite (3.35+) both run this form. Casts type the NULLs of omitted fields.
+    """
+    rows = []
+    params = []
+    for index, delta in enumerate(chunk):
+        rows.append(f'(CAST(:id_{index} AS INTEGER), CAST(:price_{index} AS NUMERIC(10, 2)), '
+                    f'CAST(:stock_{index} AS INTEGER), CAST(:active_{index} AS BOOLEAN))')
+        params.extend([
+            bindparam(f'id_{index}', delta['id'], type_=Integer),
+            bindparam(f'price_{index}', delta['price'], type_=Numeric(10, 2)),
+            bindparam(f'stock_{index}', delta['stock'], type_=Integer),
+            bindparam(f'active_{index}', delta['is_active'], type_=Boolean),
+        ])
+    return text(
+        'WITH delta (id, price, stock, is_active) AS (VALUES ' + ', '.join(rows) + ') '
+        'UPDATE product SET '
+        'price = COALESCE(delta.price, product.price), '
+        'stock = COALESCE(delta.stock, product.stock), '
+        'is_active = COALESCE(delta.is_active, product.is_active), '
+        'version = product.version + 1, '
+        'updated_at = :now '
+        'FROM delta '
+        'WHERE product.id = delta.id AND ('
+        '(delta.price IS NOT NULL AND delta.price <> product.price) OR '
+        '(delta.stock IS NOT NULL AND delta.stock <> product.stock) OR '
+        '(delta.is_active IS NOT NULL AND delta.is_active <> product.is_active)) '
+        'RETURNING product.id, product.category'
+    ).bindparams(*params, bindparam('now', type_=DateTime))
+
 
 class ProductRepository:
-    """Repository for managing product data access."""    
+    """Repository for managing product data access.
+    
+    Lookups by ID and by category are read through `cache`, which holds plain
+    column snapshots rather than session-bound objects. Write methods always
+    read from the database and invalidate the affected entries in this
+    process; other processes see the change once their entries expire.
+    """
+    
+    def __init__(self, cache: Optional[NullCache] = None):
+        self.cache = product_cache if cache is None else cache
+    
     def get_all_products(self) -> List[Product]:
         """Get all active products."""
         return Product.query.filter_by(is_active=True).all()
     
-    def get_product_by_id(self, product_id: int) -> Optional[Product]:
-        """Get a product by its ID."""
-        return Product.query.filter_by(id=product_id, is_active=True).first()
+    def get_product_by_id(self, product_id: int, use_cache: bool = True) -> Optional[Product]:
+        """Get a product by its ID.
+        
+        Pass `use_cache=False` on stock-sensitive paths to read the current row.
+        """
+        key = ('id', product_id)
+        if use_cache:
+            snapshot = self.cache.get(key)
+            if snapshot is not None:
+                return self._from_snapshot(snapshot)
+        
+        # populate_existing so a snapshot merged earlier in this session is refreshed
+        product = Product.query.filter_by(id=product_id, is_active=True).populate_existing().first()
+        if product is not None:
+            self.cache.set(key, self._snapshot(product))
+        return product
+    
+    def get_products_by_ids(self, product_ids: Iterable[int]) -> Dict[int, Product]:
+        """Get the current rows of several active products in one query, keyed by ID."""
+        product_ids = list(product_ids)
+        if not product_ids:
+            return {}
+        products = Product.query.filter(Product.id.in_(product_ids), Product.is_active == True) \
+            .populate_existing().all()
+        return {product.id: product for product in products}
     
     def get_products_by_category(self, category: str) -> List[Product]:
         """Get all products in a specific category."""
-        return Product.query.filter_by(category=category, is_active=True).all()
+        key = ('category', category)
+        snapshots = self.cache.get(key)
+        if snapshots is not None:
+            return [self._from_snapshot(snapshot) for snapshot in snapshots]
+        
+        products = Product.query.filter_by(category=category, is_active=True).order_by(Product.id).all()
+        self.cache.set(key, [self._snapshot(product) for product in products])
+        return products
+    
+    def invalidate(self, product_ids: Iterable[int] = (), categories: Iterable[str] = (),
+                   category_counts: bool = False):
+        """Drop cached entries for the given products and categories."""
+        keys = [('id', product_id) for product_id in product_ids]
+        keys.extend(('category', category) for category in categories)
+        if category_counts:
+            keys.append(_CATEGORY_COUNTS_KEY)
+        self.cache.delete(*keys)
+    
+    @staticmethod
+    def _snapshot(product: Product) -> Dict[str, Any]:
+        """Copy a product's column values into a cacheable dict."""
+        return {column.key: getattr(product, column.key) for column in Product.__table__.columns}
+    
+    @staticmethod
+    def _from_snapshot(snapshot: Dict[str, Any]) -> Product:
+        """Attach a cached snapshot to the current session without querying."""
+        product = Product(**snapshot)
+        make_transient_to_detached(product)
+        return db.session.merge(product, load=False)
+    
+    @property
+    def search_backend(self) -> ProductSearchBackend:
+        """Full-text search backend for the bound database."""
+        return get_search_backend(db.engine.dialect.name)
+    
+    def install_search_index(self):
+        """Create the full-text search index for the bound database."""
+        with db.engine.begin() as connection:
+            self.search_backend.install(connection)
     
     def search_products(self, query: str) -> List[Product]:
-        """Search products by name or description."""
-        query_lower = query.lower()
-        return Product.query.filter(
-            (Product.name.ilike(f'%{query_lower}%') | Product.description.ilike(f'%{query_lower}%')) & (Product.is_active == True)
-        ).all()
+        """Search products by name or description, best matches first."""
+        return self._filtered_query(search=query, ranked=True).order_by(Product.id).all()
+    
+    def search_products_page(self, query: str, limit: int, offset: int = 0,
+                             category: Optional[str] = None) -> Tuple[List[Product], int]:
+        """Get one page of relevance-ranked search results and the total number of matches."""
+        total = self.count_products(category, query)
+        products = self._filtered_query(category, query, ranked=True) \
+            .order_by(Product.id).limit(limit).offset(offset).all()
+        return products, total
+    
+    def get_category_counts(self) -> List[Tuple[str, int]]:
+        """Get (category, active product count) pairs sorted by category.
+        
+        Served from the product cache; write methods invalidate it whenever a
+        category or active flag changes.
+        """
+        categories = self.cache.get(_CATEGORY_COUNTS_KEY)
+        if categories is not None:
+            return categories
+        
+        rows = db.session.query(Product.category, func.count(Product.id)) \
+            .filter(Product.is_active == True) \
+            .group_by(Product.category) \
+            .order_by(Product.category) \
+            .all()
+        categories = [(category, count) for category, count in rows]
+        self.cache.set(_CATEGORY_COUNTS_KEY, categories)
+        return categories
+    
+    def get_filtered_products(self, category: Optional[str] = None, search: Optional[str] = None) -> List[Product]:
+        """Get all active products matching the optional category and search filters."""
+        return self._filtered_query(category, search, ranked=True).order_by(Product.id).all()
+    
+    def iter_products(self, category: Optional[str] = None, search: Optional[str] = None,
+                      batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Product]:
+        """Yield the active products matching the filters in ID order, without loading them all.
+        
+        Rows are fetched `batch_size` at a time (`yield_per`, a server-side
+        cursor on PostgreSQL) and are not cached, so memory stays at one batch
+        as long as the caller does not keep the yielded products.
+        """
+        query = self._filtered_query(category, search).order_by(Product.id)
+        return iter(query.yield_per(batch_size))
+    
+    def get_products_page(self, limit: int, offset: int = 0, category: Optional[str] = None,
+                          search: Optional[str] = None, total: Optional[int] = None) -> Tuple[List[Product], int]:
+        """Get one page of active products and the total number of matches.
+        
+        Pass `total` when the caller already counted the matches (see
+        `get_listing_state`) to skip the COUNT.
+        """
+        if total is None:
+            total = self.count_products(category, search)
+        products = self._filtered_query(category, search, ranked=True) \
+            .order_by(Product.id).limit(limit).offset(offset).all()
+        return products, total
+    
+    def get_products_after(self, last_id: Optional[int], limit: int, category: Optional[str] = None,
+                           search: Optional[str] = None) -> List[Product]:
+        """Get up to `limit` active products with an ID greater than `last_id` (keyset pagination)."""
+        query = self._filtered_query(category, search)
+        if last_id is not None:
+            query = query.filter(Product.id > last_id)
+        return query.order_by(Product.id).limit(limit).all()
+    
+    def get_listing_state(self, category: Optional[str] = None,
+                          search: Optional[str] = None) -> Tuple[int, int, Optional[datetime]]:
+        """Get (count, sum of versions, latest updated_at) of the matching products in one aggregate.
+        
+        Every write bumps a product's version, so the triple changes whenever a
+        matching product changes, appears or drops out of the filter.
+        """
+        count, versions, updated_at = self._filtered_query(category, search).with_entities(
+            func.count(Product.id), func.coalesce(func.sum(Product.version), 0), func.max(Product.updated_at)
+        ).one()
+        return count, int(versions), updated_at
+    
+    def count_products(self, category: Optional[str] = None, search: Optional[str] = None) -> int:
+        """Count active products matching the optional filters."""
+        return self._filtered_query(category, search).count()
+    
+    def _filtered_query(self, category: Optional[str] = None, search: Optional[str] = None,
+                        ranked: bool = False):
+        """Build the active-product query shared by listing, search and pagination.
+        
+        With `ranked`, search matches come back ordered by relevance; otherwise the
+        caller controls ordering (keyset pagination relies on ordering by ID).
+        """
+        query = Product.query.filter(Product.is_active == True)
+        if category:
+            query = query.filter(Product.category == category)
+        if search:
+            backend = self.search_backend
+            query = backend.rank(query, search) if ranked else backend.match(query, search)
+        return query
     
     def create_product(self, product_data: dict) -> Product:
         """Create a new product."""
         new_product = Product.from_dict(product_data)
         db.session.add(new_product)
         db.session.commit()
+        if new_product.is_active:
+            self.invalidate(categories=[new_product.category], category_counts=True)
         return new_product
     
+    def create_products_bulk(self, rows: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """Insert many products with one executemany and a single commit.
+        
+        `rows` hold Product column values. If the batch is rejected, rows are
+        retried one by one so a bad row fails alone. Returns the database
+        error for each row, or None where it was inserted.
+        """
+        try:
+            db.session.execute(insert(Product), rows)
+            db.session.commit()
+            errors: List[Optional[str]] = [None] * len(rows)
+        except SQLAlchemyError:
+            db.session.rollback()
+            errors = []
+            for row in rows:
+                try:
+                    db.session.execute(insert(Product), [row])
+                    db.session.commit()
+                    errors.append(None)
+                except SQLAlchemyError as e:
+                    db.session.rollback()
+                    errors.append(str(getattr(e, 'orig', None) or e).splitlines()[0])
+        
+        categories = {row['category'] for row, error in zip(rows, errors)
+                      if error is None and row.get('is_active', True)}
+        if categories:
+            self.invalidate(categories=categories, category_counts=True)
+        return errors
+    
     def update_product(self, product_id: int, product_data: dict) -> Optional[Product]:
         """Update an existing product."""
-        product = self.get_product_by_id(product_id)
+        product = self.get_product_by_id(product_id, use_cache=False)
         if product:
+            previous_category = product.category
             product.name = product_data.get('name', product.name)
             product.description = product_data.get('description', product.description)
             product.price = Decimal(str(product_data.get('price', product.price)))
             product.stock = product_data.get('stock', product.stock)
             product.category = product_data.get('category', product.category)
             product.image_url = product_data.get('image_url', product.image_url)
+            category_changed = product.category != previous_category
+            categories = {previous_category, product.category}
             db.session.commit()
+            self.invalidate([product_id], categories, category_counts=category_changed)
             return product
         return None
     
     def delete_product(self, product_id: int) -> bool:
         """Soft delete a product by setting is_active to False."""
-        product = self.get_product_by_id(product_id)
+        product = self.get_product_by_id(product_id, use_cache=False)
         if product:
             product.is_active = False
+            category = product.category
             db.session.commit()
+            self.invalidate([product_id], [category], category_counts=True)
             return True
         return False
     
     def update_stock(self, product_id: int, quantity_change: int) -> bool:
-        """Update product stock (positive to add, negative to subtract)."""
-        product = self.get_product_by_id(product_id)
-        if product and product.stock + quantity_change >= 0:
-            product.stock += quantity_change
-            db.session.commit()
-            return True
-        return False
+        """Update product stock (positive to add, negative to subtract).
+        
+        Runs as one conditional UPDATE ... RETURNING, so concurrent buyers can
+        never take stock below zero and no prior SELECT is needed.
+        """
+        row = db.session.execute(
+            update(Product)
+            .where(Product.id == product_id,
+                   Product.is_active == True,
+                   Product.stock + quantity_change >= 0)
+            .values(stock=Product.stock + quantity_change,
+                    version=Product.version + 1,
+                    updated_at=datetime.utcnow())
+            .returning(Product.category)
+            .execution_options(synchronize_session=False)
+        ).first()
+        db.session.commit()
+        if row is None:
+            return False
+        self.invalidate([product_id], [row.category])
+        return True
+    
+    def update_stock_bulk(self, quantity_changes: Dict[int, int]) -> List[int]:
+        """Apply stock changes to several products in one UPDATE, all or nothing.
+        
+        Returns the IDs whose change could not be applied (missing, inactive or
+        short of stock); when any fail, no change is applied. An empty list
+        means the whole basket was applied.
+        """
+        failed, categories = self.apply_stock_changes(quantity_changes)
+        if failed:
+            db.session.rollback()
+            return failed
+        db.session.commit()
+        self.invalidate(quantity_changes, categories)
+        return []
+    
+    def apply_stock_changes(self, quantity_changes: Dict[int, int],
+                            require_active: bool = True) -> Tuple[List[int], set]:
+        """Run the bulk stock UPDATE inside the caller's transaction.
+        
+        Returns the IDs that could not be changed and the categories of the
+        rows that were. The caller commits or rolls back, and invalidates the
+        cache after committing. `require_active=False` lets stock be returned
+        to products that were deactivated meanwhile.
+        """
+        if not quantity_changes:
+            return [], set()
+        
+        change = case(quantity_changes, value=Product.id)
+        conditions = [Product.id.in_(list(quantity_changes)), Product.stock + change >= 0]
+        if require_active:
+            conditions.append(Product.is_active == True)
+        rows = db.session.execute(
+            update(Product)
+            .where(*conditions)
+            .values(stock=Product.stock + change,
+                    version=Product.version + 1,
+                    updated_at=datetime.utcnow())
+            .returning(Product.id, Product.category)
+            .execution_options(synchronize_session=False)
+        ).all()
+        
+        applied = {row.id for row in rows}
+        return sorted(set(quantity_changes) - applied), {row.category for row in rows}
+    
+    def apply_product_deltas(self, deltas: List[Dict[str, Any]]) -> Dict[int, str]:
+        """Apply price/stock/active-flag changes to many products in one transaction.
+        
+        Each delta has an `id` and any of `price`, `stock` (new absolute level)
+        and `is_active`; None leaves the column as is. Every chunk is one
+        UPDATE ... FROM (VALUES ...) that only touches rows whose values
+        actually change, bumping their version. The cache is invalidated once
+        after the commit. Returns 'updated', 'unchanged' or 'not_found' per ID.
+        """
+        outcomes: Dict[int, str] = {}
+        categories = set()
+        active_changed = False
+        now = datetime.utcnow()
+        for start in range(0, len(deltas), DELTA_CHUNK_SIZE):
+            chunk = deltas[start:start + DELTA_CHUNK_SIZE]
+            rows = db.session.execute(_delta_update(chunk), {'now': now}).all()
+            for row in rows:
+                outcomes[row.id] = 'updated'
+                categories.add(row.category)
+            active_changed = active_changed or any(
+                delta['is_active'] is not None and outcomes.get(delta['id']) == 'updated' for delta in chunk
+            )
+        
+            missing = [delta['id'] for delta in chunk if delta['id'] not in outcomes]
+            if missing:
+                existing = set(db.session.scalars(select(Product.id).where(Product.id.in_(missing))))
+                for product_id in missing:
+                    outcomes[product_id] = 'unchanged' if product_id in existing else 'not_found'
+        db.session.commit()
+        
+        updated = [product_id for product_id, outcome in outcomes.items() if outcome == 'updated']
+        if updated:
+            self.invalidate(updated, categories, category_counts=active_changed)
+        return outcomes
     
     def check_stock_availability(self, product_id: int, required_quantity: int) -> bool:
         """Check if enough stock is available for a product."""
-        product = self.get_product_by_id(product_id)
+        product = self.get_product_by_id(product_id, use_cache=False)
         return product is not None and product.stock >= required_quantity
 
     def populate_db(self):
@@ -114,4 +462,5 @@ class ProductRepository:
                 )
             ]
             db.session.bulk_save_objects(sample_products)
-            db.session.commit()
\ No newline at end of file
+            db.session.commit()
+            self.cache.clear()
\ No newline at end of file
@@ -0,0 +1,148 @@
+from typing import Dict, List
+import re
+from sqlalchemy import false, func, literal_column, select, text
+from models.product import Product
+
+# Maximum number of search terms taken from a user query
+MAX_SEARCH_TERMS = 8
+
+_TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+class ProductSearchBackend:
+    """Fallback search backend using ILIKE on name and description.
+
+    Backends expose two operations on a Product query: `match` only filters,
+    keeping the caller's ordering (used by keyset pagination), and `rank`
+    filters and orders by relevance.
+    """
+    name = 'like'
+
+    def install(self, connection) -> None:
+        """Create the index structures used by this backend (idempotent)."""
+
+    def terms(self, search: str) -> List[str]:
+        """Split a user query into plain word terms."""
+        return _TERM_PATTERN.findall(search.lower())[:MAX_SEARCH_TERMS]
+
+    def match(self, query, search: str):
+        """Filter a Product query to rows matching `search`."""
+        query_lower = search.lower()
+        return query.filter(
+            Product.name.ilike(f'%{query_lower}%') | Product.description.ilike(f'%{query_lower}%')
+        )
+
+    def rank(self, query, search: str):
+        """Filter a Product query to rows matching `search`, best matches first."""
+        return self.match(query, search)
+
+
+class PostgresProductSearch(ProductSearchBackend):
+    """Full-text search on a generated, GIN-indexed tsvector column."""
+    name = 'postgresql'
+
+    def install(self, connection) -> None:
+        connection.execute(text(
+            "ALTER TABLE product ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+            ") STORED"
+        ))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_product_search_vector ON product USING GIN (search_vector)"
+        ))
+
+    def _tsquery(self, terms: List[str]):
+        # Every term must match, as a prefix so partial words still find results
+        expression = ' & '.join(f'{term}:*' for term in terms)
+        return func.to_tsquery('simple', expression)
+
+    def match(self, query, search: str):
+        terms = self.terms(search)
+        if not terms:
+            return query.filter(false())
+        return query.filter(literal_column('product.search_vector').op('@@')(self._tsquery(terms)))
+
+    def rank(self, query, search: str):
+        terms = self.terms(search)
+        if not terms:
+            return query.filter(false())
+        vector = literal_column('product.search_vector')
+        tsquery = self._tsquery(terms)
+        return query.filter(vector.op('@@')(tsquery)) \
+            .order_by(func.ts_rank_cd(vector, tsquery).desc())
+
+
+class SqliteProductSearch(ProductSearchBackend):
+    """Full-text search on an FTS5 table kept in sync with `product` by triggers."""
+    name = 'sqlite'
+
+    def install(self, connection) -> None:
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_fts'"
+        )).first()
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5("
+            "name, description, content='product', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product BEGIN "
+            "INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description); "
+            "END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN "
+            "INSERT INTO product_fts(product_fts, rowid, name, description) "
+            "VALUES ('delete', old.id, old.name, old.description); "
+            "END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS product_fts_au AFTER UPDATE OF name, description ON product BEGIN "
+            "INSERT INTO product_fts(product_fts, rowid, name, description) "
+            "VALUES ('delete', old.id, old.name, old.description); "
+            "INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description); "
+            "END"
+        ))
+        if not exists:
+            connection.execute(text("INSERT INTO product_fts(product_fts) VALUES ('rebuild')"))
+
+    def _match_expression(self, terms: List[str]) -> str:
+        # Terms are \w+ only, so quoting them cannot inject FTS5 syntax
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def _matches(self, terms: List[str]):
+        return text(
+            "SELECT rowid, bm25(product_fts, 10.0, 1.0) AS score "
+            "FROM product_fts WHERE product_fts MATCH :fts_query"
+        ).bindparams(fts_query=self._match_expression(terms)) \
+            .columns(literal_column('rowid'), literal_column('score')) \
+            .subquery('product_matches')
+
+    def match(self, query, search: str):
+        terms = self.terms(search)
+        if not terms:
+            return query.filter(false())
+        matches = self._matches(terms)
+        return query.filter(Product.id.in_(select(matches.c.rowid)))
+
+    def rank(self, query, search: str):
+        terms = self.terms(search)
+        if not terms:
+            return query.filter(false())
+        matches = self._matches(terms)
+        # bm25() scores are lower for better matches
+        return query.join(matches, Product.id == matches.c.rowid).order_by(matches.c.score)
+
+
+_BACKENDS: Dict[str, ProductSearchBackend] = {
+    'postgresql': PostgresProductSearch(),
+    'sqlite': SqliteProductSearch(),
+}
+_FALLBACK = ProductSearchBackend()
+
+
+def get_search_backend(dialect_name: str) -> ProductSearchBackend:
+    """Get the search backend for a SQLAlchemy dialect name."""
+    return _BACKENDS.get(dialect_name, _FALLBACK)
@@ -1,3 +1,5 @@
+from typing import Optional
+from sqlalchemy import select
 from models.user import User
 from models.database import db
 
@@ -15,3 +17,22 @@ class UserRepository:
         db.session.add(new_user)
         db.session.commit()
         return new_user
+
+    def update_password(self, user: User, password: str) -> User:
+        """Re-hash and store a user's password."""
+        user.set_password(password)
+        db.session.commit()
+        return user
+
+    def is_admin(self, user_id: int) -> bool:
+        """Whether the user exists and holds the admin flag, read without loading the row."""
+        return bool(db.session.scalar(select(User.is_admin).where(User.id == user_id)))
+
+    def set_admin(self, username: str, is_admin: bool) -> Optional[User]:
+        """Grant or revoke the admin flag; returns None for an unknown username."""
+        user = self.get_user_by_username(username)
+        if user is None:
+            return None
+        user.is_admin = is_admin
+        db.session.commit()
+        return user
@@ -1,8 +1,10 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+from datetime import datetime
 from models.cart import Cart
 from repositories.cart_repository import CartRepository
 from repositories.product_repository import ProductRepository
 from services.product_service import ProductService
+from utils.http_cache import make_etag
 
 
 class CartService:
@@ -13,19 +15,27 @@ class CartService:
         self.product_repository = product_repository
         self.product_service = ProductService(product_repository)
     
+    def is_owned_by_other(self, cart_id: str, user_id: Optional[Any]) -> bool:
+        """Whether the cart belongs to a user other than `user_id` (None: anonymous caller).
+        
+        Anonymous carts are reachable by anyone holding their ID.
+        """
+        owner = self.cart_repository.get_cart_owner(cart_id)
+        return owner is not None and (user_id is None or owner != str(user_id))
+    
     def get_or_create_cart(self, cart_id: Optional[str] = None, user_id: Optional[str] = None) -> Dict[str, Any]:
         """Get existing cart or create a new one."""
         cart = self.cart_repository.get_or_create_cart(cart_id, user_id)
         return {
             'success': True,
-            'cart': cart.to_dict(),
+            'cart': cart.to_dict(fragments=True),
             'message': 'Cart retrieved successfully'
         }
     
     def add_product_to_cart(self, cart_id: str, product_id: int, quantity: int = 1) -> Dict[str, Any]:
         """Add a product to the cart."""
         # Validate product availability
-        availability = self.product_service.check_product_availability(product_id, quantity)
+        availability = self.product_service.check_product_availability(product_id, quantity, fresh=True)
         if not availability['available']:
             return {
                 'success': False,
@@ -45,7 +55,7 @@ class CartService:
         return {
             'success': True,
             'message': f'Added {quantity} item(s) to cart',
-            'cart': cart.to_dict()
+            'cart': cart.to_dict(fragments=True)
         }
     
     def remove_product_from_cart(self, cart_id: str, product_id: int) -> Dict[str, Any]:
@@ -55,7 +65,7 @@ class CartService:
             return {
                 'success': True,
                 'message': 'Product removed from cart',
-                'cart': cart.to_dict()
+                'cart': cart.to_dict(fragments=True)
             }
         else:
             return {
@@ -72,7 +82,7 @@ class CartService:
             return {
                 'success': True,
                 'message': f'Product quantity {action} cart',
-                'cart': cart.to_dict()
+                'cart': cart.to_dict(fragments=True)
             }
         else:
             return {
@@ -81,6 +91,13 @@ class CartService:
                 'cart': None
             }
     
+    def get_cart_etag(self, cart_id: str) -> Optional[Tuple[str, Optional[datetime]]]:
+        """Get the ETag and last modification time of a cart without loading its items."""
+        state = self.cart_repository.get_cart_state(cart_id)
+        if state is None:
+            return None
+        return make_etag('cart', cart_id, state['version']), state['last_modified']
+    
     def get_cart_details(self, cart_id: str) -> Dict[str, Any]:
         """Get detailed cart information."""
         cart = self.cart_repository.get_cart_by_id(cart_id)
@@ -91,14 +108,14 @@ class CartService:
                 'cart': None
             }
         
-        cart_dict = cart.to_dict()
+        cart_dict = cart.to_dict(fragments=True)
         
         # Add additional cart statistics
         cart_dict['statistics'] = {
-            'total_items': cart.get_item_count(),
-            'total_amount': float(cart.get_total()),
-            'unique_products': len(cart.items),
-            'is_empty': len(cart.items) == 0
+            'total_items': cart_dict['item_count'],
+            'total_amount': cart_dict['total'],
+            'unique_products': len(cart_dict['items']),
+            'is_empty': len(cart_dict['items']) == 0
         }
         
         return {
@@ -107,6 +124,62 @@ class CartService:
             'cart': cart_dict
         }
     
+    def apply_cart_operations(self, cart_id: str, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply many add/update/remove operations and render the cart once.
+        
+        Availability of every added product is checked with one query; the
+        operations that pass are applied in one transaction. Each operation
+        gets its own result, so one failure does not reject the batch.
+        """
+        products = self.product_repository.get_products_by_ids(
+            {operation['product_id'] for operation in operations if operation['op'] == 'add'}
+        )
+        
+        results: List[Dict[str, Any]] = []
+        accepted: List[Dict[str, Any]] = []
+        for index, operation in enumerate(operations):
+            result = {'index': index, 'op': operation['op'], 'product_id': operation['product_id']}
+            results.append(result)
+            if operation['op'] == 'add':
+                availability = self.product_service.evaluate_availability(
+                    products.get(operation['product_id']), operation['quantity']
+                )
+                if not availability['available']:
+                    result.update(success=False, message=availability['reason'])
+                    continue
+            accepted.append(operation)
+        
+        applied = self.cart_repository.apply_item_operations(cart_id, accepted) if accepted else []
+        cart = self.cart_repository.get_cart_by_id(cart_id) if applied is not None else None
+        if not cart:
+            return {
+                'success': False,
+                'message': 'Cart not found',
+                'results': [],
+                'cart': None
+            }
+        
+        outcomes = iter(applied)
+        for result, operation in zip(results, operations):
+            if 'success' in result:
+                continue
+            if not next(outcomes):
+                result.update(success=False, message='Product not found in cart')
+            elif operation['op'] == 'add':
+                result.update(success=True, message=f"Added {operation['quantity']} item(s) to cart")
+            elif operation['op'] == 'update' and operation['quantity'] > 0:
+                result.update(success=True, message='Product quantity updated in cart')
+            else:
+                result.update(success=True, message='Product removed from cart')
+        
+        succeeded = sum(1 for result in results if result['success'])
+        return {
+            'success': True,
+            'message': f'{succeeded} of {len(results)} operation(s) applied',
+            'results': results,
+            'cart': cart.to_dict(fragments=True)
+        }
+    
     def clear_cart(self, cart_id: str) -> Dict[str, Any]:
         """Clear all items from the cart."""
         if self.cart_repository.clear_cart(cart_id):
@@ -114,7 +187,7 @@ class CartService:
             return {
                 'success': True,
                 'message': 'Cart cleared successfully',
-                'cart': cart.to_dict()
+                'cart': cart.to_dict(fragments=True)
             }
         else:
             return {
@@ -140,30 +213,52 @@ class CartService:
                 'issues': []
             }
         
-        issues = []
-        for item in cart.items:
-            # Check if product is still active
-            current_product = self.product_repository.get_product_by_id(item.product.id)
-            if not current_product or not current_product.is_active:
-                issues.append({
-                    'product_id': item.product.id,
-                    'product_name': item.product.name,
-                    'issue': 'Product is no longer available'
-                })
-                continue
-            
-            # Check stock availability
-            if not self.product_repository.check_stock_availability(item.product.id, item.quantity):
-                available_stock = current_product.stock
-                issues.append({
-                    'product_id': item.product.id,
-                    'product_name': item.product.name,
-                    'issue': f'Insufficient stock. Requested: {item.quantity}, Available: {available_stock}'
-                })
+        issues = [
+            self._format_issue(line)
+            for line in self.cart_repository.get_checkout_issues([cart_id])
+        ]
         
         return {
             'valid': len(issues) == 0,
             'message': 'Cart is valid for checkout' if len(issues) == 0 else 'Cart has validation issues',
             'issues': issues,
-            'cart': cart.to_dict()
-        }
\ No newline at end of file
+            'cart': cart.to_dict(fragments=True)
+        }
+    
+    def validate_carts_for_checkout(self, cart_ids: List[str], user_id: Optional[Any] = None) -> Dict[str, Dict[str, Any]]:
+        """Validate many carts for checkout at once, keyed by cart ID.
+        
+        Carts of users other than `user_id` are reported as not found.
+        """
+        item_counts = self.cart_repository.get_item_counts(cart_ids, None if user_id is None else str(user_id))
+        issues_by_cart: Dict[str, List[Dict[str, Any]]] = {}
+        if item_counts:
+            for line in self.cart_repository.get_checkout_issues(list(item_counts)):
+                issues_by_cart.setdefault(line['cart_id'], []).append(self._format_issue(line))
+        
+        results = {}
+        for cart_id in cart_ids:
+            if cart_id not in item_counts:
+                results[cart_id] = {'valid': False, 'message': 'Cart not found', 'issues': []}
+            elif item_counts[cart_id] == 0:
+                results[cart_id] = {'valid': False, 'message': 'Cart is empty', 'issues': []}
+            else:
+                issues = issues_by_cart.get(cart_id, [])
+                results[cart_id] = {
+                    'valid': len(issues) == 0,
+                    'message': 'Cart is valid for checkout' if len(issues) == 0 else 'Cart has validation issues',
+                    'issues': issues
+                }
+        return results
+    
+    def _format_issue(self, line: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn a checkout issue row into the issue shape returned by the API."""
+        if not line['is_active']:
+            message = 'Product is no longer available'
+        else:
+            message = f"Insufficient stock. Requested: {line['quantity']}, Available: {line['stock']}"
+        return {
+            'product_id': line['product_id'],
+            'product_name': line['product_name'],
+            'issue': message
+        }
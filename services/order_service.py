@@ -0,0 +1,123 @@
+from typing import Any, Dict, Optional
+from flask import current_app
+from models.cart import Cart
+from models.order import Order, ORDER_RESERVED
+from repositories.cart_repository import CartRepository
+from repositories.order_repository import OrderRepository
+from services.cart_service import CartService
+
+# Expired reservations a failed checkout may release before retrying; the
+# rest is left to `flask release-reservations`
+CHECKOUT_RELEASE_BATCH = 20
+
+
+class OrderService:
+    """Service layer for checkout and order business logic."""
+
+    def __init__(self, order_repository: OrderRepository, cart_repository: CartRepository):
+        self.order_repository = order_repository
+        self.cart_repository = cart_repository
+        self.cart_service = CartService(cart_repository, order_repository.product_repository)
+
+    def checkout(self, cart_id: str) -> Dict[str, Any]:
+        """Reserve the stock of a cart for `CHECKOUT_RESERVATION_TTL` seconds.
+
+        The reservation becomes an order when it is confirmed before it
+        expires; otherwise its stock goes back to the catalog. Checking out
+        again returns the cart's live reservation while it still matches the
+        cart (`reused`), and replaces it once the cart has changed.
+        """
+        cart = self.cart_repository.get_cart_by_id(cart_id)
+        if not cart:
+            return {'success': False, 'message': 'Cart not found', 'issues': [], 'order': None}
+        if not cart.items:
+            return {'success': False, 'message': 'Cart is empty', 'issues': [], 'order': None}
+
+        ttl = current_app.config['CHECKOUT_RESERVATION_TTL']
+        existing = self.order_repository.get_live_reservation(cart_id)
+        if existing is not None:
+            if self._matches(existing, cart):
+                return self._reserved(existing, 'Stock already reserved', reused=True)
+            self.order_repository.release_reservation(existing.id)
+            cart = self.cart_repository.get_cart_by_id(cart_id)
+
+        order, failed = self.order_repository.reserve_cart(cart, ttl)
+        if order is None and failed:
+            # Stock held by abandoned checkouts may be what is missing
+            if self.order_repository.release_expired_reservations(CHECKOUT_RELEASE_BATCH, failed):
+                cart = self.cart_repository.get_cart_by_id(cart_id)
+                order, failed = self.order_repository.reserve_cart(cart, ttl)
+
+        if order is None and not failed:
+            # Another request checked the cart out or changed it meanwhile
+            existing = self.order_repository.get_live_reservation(cart_id)
+            cart = self.cart_repository.get_cart_by_id(cart_id)
+            if existing is not None and cart is not None and self._matches(existing, cart):
+                return self._reserved(existing, 'Stock already reserved', reused=True)
+            return {'success': False, 'message': 'Cart changed during checkout', 'issues': [], 'order': None}
+
+        if order is None:
+            issues = [
+                self.cart_service._format_issue(line)
+                for line in self.cart_repository.get_checkout_issues([cart_id])
+                if line['product_id'] in failed
+            ]
+            return {
+                'success': False,
+                'message': 'Cart has validation issues',
+                'issues': issues,
+                'order': None
+            }
+
+        return self._reserved(order, f'Stock reserved for {ttl} seconds', reused=False)
+
+    @staticmethod
+    def _matches(order: Order, cart: Cart) -> bool:
+        """Whether a reservation holds exactly the cart's lines at the current prices."""
+        reserved = {item.product_id: (item.quantity, item.unit_price) for item in order.items}
+        wanted = {item.product_id: (item.quantity, item.product.price) for item in cart.items}
+        return reserved == wanted
+
+    @staticmethod
+    def _reserved(order: Order, message: str, reused: bool) -> Dict[str, Any]:
+        """Build the checkout result for a live reservation."""
+        return {
+            'success': True,
+            'message': message,
+            'issues': [],
+            'order': order.to_dict(),
+            'reused': reused
+        }
+
+    def is_owned_by_other(self, order_id: str, user_id: Optional[Any]) -> bool:
+        """Whether the order belongs to a user other than `user_id` (None: anonymous caller)."""
+        owner = self.order_repository.get_order_owner(order_id)
+        return owner is not None and (user_id is None or owner != str(user_id))
+
+    def get_order(self, order_id: str) -> Dict[str, Any]:
+        """Get an order by ID."""
+        order = self.order_repository.get_order_by_id(order_id)
+        if not order:
+            return {'success': False, 'message': 'Order not found', 'order': None}
+        return {'success': True, 'message': 'Order retrieved successfully', 'order': order.to_dict()}
+
+    def confirm_order(self, order_id: str) -> Dict[str, Any]:
+        """Place a reserved order; fails once the reservation has expired or ended."""
+        if self.order_repository.place_order(order_id):
+            return self.get_order(order_id) | {'message': 'Order placed successfully'}
+
+        order = self.order_repository.get_order_by_id(order_id)
+        if not order:
+            return {'success': False, 'message': 'Order not found', 'order': None}
+        message = 'Reservation has expired' if order.status == ORDER_RESERVED else f'Order is already {order.status}'
+        return {'success': False, 'message': message, 'order': order.to_dict()}
+
+    def cancel_order(self, order_id: str) -> Dict[str, Any]:
+        """Cancel a reserved order and return its stock."""
+        if self.order_repository.release_reservation(order_id):
+            return self.get_order(order_id) | {'message': 'Reservation cancelled'}
+
+        order = self.order_repository.get_order_by_id(order_id)
+        if not order:
+            return {'success': False, 'message': 'Order not found', 'order': None}
+        return {'success': False, 'message': f'Order is already {order.status}', 'order': order.to_dict()}
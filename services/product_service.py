@@ -1,24 +1,113 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Tuple
+from datetime import datetime
+from decimal import Decimal
+import base64
+import binascii
+import json
 from models.product import Product
+from utils.feeds import FeedRecord
+from utils.http_cache import make_etag
+from utils.serialization import JSONFragment
 from repositories.product_repository import ProductRepository
 
+# Rows written per INSERT/commit by `import_products`
+DEFAULT_IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_IMPORT_ERRORS = 1000
+
+# Column limits checked before insert, so one long value cannot fail a whole batch
+IMPORT_FIELD_LENGTHS = {'name': 100, 'category': 50, 'image_url': 200}
+MAX_PRICE = Decimal('100000000')  # Numeric(10, 2)
+
+_TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+_FALSE_VALUES = {'0', 'false', 'no', 'n', 'f'}
+
 
 class ProductService:
-    """Service layer for product business logic."""
+    """Service layer for product business logic.
+    
+    Product lists are returned as pre-encoded JSON fragments (see
+    `Product.to_fragment`), which the app's JSON provider splices into responses.
+    """
     
     def __init__(self, product_repository: ProductRepository):
         self.product_repository = product_repository
     
-    def get_all_products(self, category: Optional[str] = None, search: Optional[str] = None) -> List[Dict[str, Any]]:
+    def get_all_products(self, category: Optional[str] = None, search: Optional[str] = None) -> List[JSONFragment]:
         """Get all products with optional filtering."""
-        if search:
-            products = self.product_repository.search_products(search)
-        elif category:
-            products = self.product_repository.get_products_by_category(category)
-        else:
-            products = self.product_repository.get_all_products()
+        products = self.product_repository.get_filtered_products(category, search)
+        return [product.to_fragment() for product in products]
+    
+    def iter_products(self, category: Optional[str] = None, search: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Get the matching products one at a time, in ID order, for streamed responses.
+        
+        The query starts here, so database errors surface before the response
+        does; rows are then fetched in batches as the iterator is consumed.
+        """
+        products = self.product_repository.iter_products(category, search)
+        return (product.to_dict() for product in products)
+    
+    def get_products_page(self, limit: int, offset: int = 0, category: Optional[str] = None,
+                          search: Optional[str] = None, total: Optional[int] = None) -> Dict[str, Any]:
+        """Get one page of products using LIMIT/OFFSET, with the total match count.
+        
+        A `total` from `get_products_etag` is reused instead of counting again.
+        """
+        products, total = self.product_repository.get_products_page(limit, offset, category, search, total)
+        return {
+            'products': [product.to_fragment() for product in products],
+            'total': total
+        }
+    
+    def get_products_by_cursor(self, limit: int, cursor: Optional[str] = None, category: Optional[str] = None,
+                               search: Optional[str] = None) -> Dict[str, Any]:
+        """Get one page of products using an opaque keyset cursor.
+        
+        The cursor carries the filters it was issued for, so follow-up pages only
+        need the cursor. Raises ValueError for malformed or mismatched cursors.
+        """
+        last_id, category, search = self._resolve_cursor(cursor, category, search)
+        products = self.product_repository.get_products_after(last_id, limit + 1, category, search)
+        has_more = len(products) > limit
+        products = products[:limit]
+        next_cursor = None
+        if has_more:
+            next_cursor = self._encode_cursor(products[-1].id, category, search)
+        
+        return {
+            'products': [product.to_fragment() for product in products],
+            'next_cursor': next_cursor,
+            'has_more': has_more
+        }
+    
+    def get_products_etag(self, category: Optional[str] = None, search: Optional[str] = None,
+                          limit: Optional[int] = None, offset: int = 0,
+                          cursor: Optional[str] = None) -> Tuple[str, int]:
+        """Compute the ETag of a product listing and the number of matching products.
         
-        return [product.to_dict() for product in products]
+        Arguments mirror the listing modes: `cursor` not None selects keyset
+        pagination, `limit` selects offset pagination, otherwise the full list.
+        Every mode hashes one aggregate over the filter, so a page's ETag also
+        changes when a product on another page does.
+        """
+        if cursor is not None:
+            last_id, category, search = self._resolve_cursor(cursor, category, search)
+            state = self.product_repository.get_listing_state(category, search)
+            return make_etag('products', 'cursor', category, search, limit, last_id, state), state[0]
+        state = self.product_repository.get_listing_state(category, search)
+        if limit:
+            return make_etag('products', 'page', category, search, limit, offset, state), state[0]
+        return make_etag('products', 'all', category, search, state), state[0]
+    
+    def get_product_etag(self, product_id: int) -> Optional[Tuple[str, Optional[datetime]]]:
+        """Get the ETag and last modification time of a product, or None if not found."""
+        product = self.product_repository.get_product_by_id(product_id)
+        if not product:
+            return None
+        return make_etag('product', product.id, product.version), product.updated_at
+    
+    def get_categories_etag(self) -> str:
+        """Compute the ETag of the category listing."""
+        return make_etag('categories', self.product_repository.get_category_counts())
     
     def get_product_detail(self, product_id: int) -> Optional[Dict[str, Any]]:
         """Get detailed information about a specific product."""
@@ -31,10 +120,16 @@ class ProductService:
             return product_dict
         return None
     
-    def check_product_availability(self, product_id: int, quantity: int = 1) -> Dict[str, Any]:
-        """Check if a product is available in the requested quantity."""
-        product = self.product_repository.get_product_by_id(product_id)
+    def check_product_availability(self, product_id: int, quantity: int = 1, fresh: bool = False) -> Dict[str, Any]:
+        """Check if a product is available in the requested quantity.
         
+        With `fresh`, the product cache is bypassed so stock reflects the database.
+        """
+        product = self.product_repository.get_product_by_id(product_id, use_cache=not fresh)
+        return self.evaluate_availability(product, quantity)
+    
+    def evaluate_availability(self, product: Optional[Product], quantity: int) -> Dict[str, Any]:
+        """Check an already loaded product (None if it was not found) against a quantity."""
         if not product:
             return {
                 'available': False,
@@ -64,21 +159,62 @@ class ProductService:
             'available_stock': product.stock
         }
     
-    def get_products_by_category(self, category: str) -> List[Dict[str, Any]]:
+    def get_products_by_category(self, category: str) -> List[JSONFragment]:
         """Get all products in a specific category."""
         products = self.product_repository.get_products_by_category(category)
-        return [product.to_dict() for product in products]
+        return [product.to_fragment() for product in products]
     
-    def search_products(self, query: str) -> List[Dict[str, Any]]:
-        """Search products by name or description."""
-        products = self.product_repository.search_products(query)
-        return [product.to_dict() for product in products]
+    def search_products(self, query: str, limit: int = 20, offset: int = 0,
+                        category: Optional[str] = None) -> Dict[str, Any]:
+        """Search products by name or description, ranked by relevance."""
+        products, total = self.product_repository.search_products_page(query, limit, offset, category)
+        return {
+            'products': [product.to_fragment() for product in products],
+            'total': total
+        }
     
     def get_product_categories(self) -> List[str]:
         """Get all unique product categories."""
-        products = self.product_repository.get_all_products()
-        categories = list(set(product.category for product in products))
-        return sorted(categories)
+        return [category for category, _ in self.product_repository.get_category_counts()]
+    
+    def get_category_summary(self) -> List[Dict[str, Any]]:
+        """Get all product categories with their number of active products."""
+        return [
+            {'name': category, 'product_count': count}
+            for category, count in self.product_repository.get_category_counts()
+        ]
+    
+    def _resolve_cursor(self, cursor: Optional[str], category: Optional[str],
+                        search: Optional[str]) -> Tuple[Optional[int], Optional[str], Optional[str]]:
+        """Get (last_id, category, search) for a cursor request; raises ValueError."""
+        if not cursor:
+            return None, category, search
+        state = self._decode_cursor(cursor)
+        if (category and category != state['category']) or (search and search != state['search']):
+            raise ValueError('Cursor does not match the requested filters')
+        return state['last_id'], state['category'], state['search']
+    
+    @staticmethod
+    def _encode_cursor(last_id: int, category: Optional[str], search: Optional[str]) -> str:
+        """Encode keyset pagination state as an opaque URL-safe token."""
+        payload = json.dumps({'k': last_id, 'c': category, 's': search}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Dict[str, Any]:
+        """Decode a token produced by `_encode_cursor`."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            last_id = payload['k']
+            category = payload.get('c')
+            search = payload.get('s')
+        except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+            raise ValueError('Invalid cursor')
+        if not isinstance(last_id, int) or not isinstance(category, (str, type(None))) \
+                or not isinstance(search, (str, type(None))):
+            raise ValueError('Invalid cursor')
+        return {'last_id': last_id, 'category': category, 'search': search}
     
     def validate_product_data(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
         """Validate product data before creation or update."""
@@ -87,22 +223,29 @@ class ProductService:
         # Required fields validation
         required_fields = ['name', 'description', 'price', 'stock', 'category']
         for field in required_fields:
-            if field not in product_data or not product_data[field]:
+            # 0 is a valid price or stock; only missing or empty values are rejected
+            value = product_data.get(field)
+            if value is None or (isinstance(value, str) and not value.strip()):
                 errors.append(f'{field} is required')
         
-        # Data type and value validation
-        if 'price' in product_data:
+        # Data type and value validation; bools are ints in Python but not prices or stock
+        price = product_data.get('price')
+        if price is not None:
             try:
-                price = float(product_data['price'])
-                if price < 0:
+                if isinstance(price, bool) or not isinstance(price, (int, float, str, Decimal)):
+                    raise TypeError
+                if Decimal(str(price).strip()) < 0:
                     errors.append('Price must be non-negative')
-            except (ValueError, TypeError):
+            except (ArithmeticError, ValueError, TypeError):
                 errors.append('Price must be a valid number')
         
-        if 'stock' in product_data:
+        stock = product_data.get('stock')
+        if stock is not None:
             try:
-                stock = int(product_data['stock'])
-                if stock < 0:
+                # int('2.9') raises, so fractional stock is rejected rather than truncated
+                if isinstance(stock, bool) or not isinstance(stock, (int, str)):
+                    raise TypeError
+                if int(stock) < 0:
                     errors.append('Stock must be non-negative')
             except (ValueError, TypeError):
                 errors.append('Stock must be a valid integer')
@@ -111,3 +254,172 @@ class ProductService:
             'valid': len(errors) == 0,
             'errors': errors
         }
+    
+    def import_products(self, records: Iterable[FeedRecord], batch_size: int = DEFAULT_IMPORT_BATCH_SIZE,
+                        max_errors: int = MAX_REPORTED_IMPORT_ERRORS) -> Dict[str, Any]:
+        """Create products from a stream of feed records (see `utils.feeds`).
+        
+        Records are validated one at a time and written `batch_size` at a time,
+        so memory is bounded by one batch whatever the feed size. Invalid rows
+        are reported by line number and skipped; they never abort the import.
+        Only the first `max_errors` errors are listed.
+        """
+        imported = 0
+        failed = 0
+        errors: List[Dict[str, Any]] = []
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+        
+        def report(line: int, messages: List[str]):
+            nonlocal failed
+            failed += 1
+            if len(errors) < max_errors:
+                errors.append({'line': line, 'errors': messages})
+        
+        def flush():
+            nonlocal imported
+            results = self.product_repository.create_products_bulk([row for _, row in batch])
+            for (line, _), error in zip(batch, results):
+                if error is None:
+                    imported += 1
+                else:
+                    report(line, [error])
+            batch.clear()
+        
+        for line, record, parse_error in records:
+            if parse_error is not None:
+                report(line, [parse_error])
+                continue
+            row, row_errors = self._import_row(record)
+            if row_errors:
+                report(line, row_errors)
+                continue
+            batch.append((line, row))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        
+        return {
+            'success': failed == 0,
+            'imported': imported,
+            'failed': failed,
+            'errors': errors,
+            'errors_truncated': failed > len(errors)
+        }
+    
+    def _import_row(self, record: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+        """Validate a feed record and convert it to Product column values."""
+        errors = self.validate_product_data(record)['errors']
+        if errors:
+            return None, errors
+        
+        try:
+            price = Decimal(str(record['price']).strip())
+            stock = int(record['stock'])
+        except (ArithmeticError, ValueError, TypeError):
+            # validate_product_data should have caught this; never let one row abort the feed
+            return None, ['price and stock must be numbers']
+        
+        row = {
+            'name': str(record['name']).strip(),
+            'description': str(record['description']).strip(),
+            'price': price,
+            'stock': stock,
+            'category': str(record['category']).strip(),
+            'image_url': (str(record['image_url']).strip() or None) if record.get('image_url') else None,
+            'is_active': True
+        }
+        if not row['price'].is_finite() or row['price'] >= MAX_PRICE:
+            errors.append(f'Price must be less than {MAX_PRICE}')
+        for field, max_length in IMPORT_FIELD_LENGTHS.items():
+            if row[field] is not None and len(row[field]) > max_length:
+                errors.append(f'{field} must be at most {max_length} characters')
+        
+        is_active = record.get('is_active')
+        if isinstance(is_active, str) and is_active.strip():
+            flag = is_active.strip().lower()
+            if flag not in _TRUE_VALUES and flag not in _FALSE_VALUES:
+                errors.append('is_active must be true or false')
+            row['is_active'] = flag in _TRUE_VALUES
+        elif isinstance(is_active, bool):
+            row['is_active'] = is_active
+        elif is_active not in (None, ''):
+            errors.append('is_active must be true or false')
+        
+        return (None, errors) if errors else (row, [])
+    
+    def sync_products(self, updates: List[Any]) -> Dict[str, Any]:
+        """Apply a batch of ERP price/stock/active-flag deltas.
+        
+        Each update is `{"id": ..., "price"?, "stock"?, "is_active"?}`; fields
+        left out are not touched. Valid updates are written together by the
+        repository in set-based chunks; invalid ones are reported and skipped.
+        Returns per-ID outcomes in request order plus counts per outcome.
+        """
+        results: List[Dict[str, Any]] = []
+        deltas: List[Dict[str, Any]] = []
+        seen = set()
+        for update in updates:
+            delta, error = self._sync_delta(update)
+            if error is None and delta['id'] in seen:
+                error = 'Duplicate id in batch'
+            product_id = update.get('id') if isinstance(update, dict) else None
+            if error is not None:
+                results.append({'id': product_id, 'status': 'invalid', 'message': error})
+                continue
+            seen.add(delta['id'])
+            deltas.append(delta)
+            results.append({'id': delta['id'], 'status': None})
+        
+        outcomes = self.product_repository.apply_product_deltas(deltas) if deltas else {}
+        counts = {'updated': 0, 'unchanged': 0, 'not_found': 0, 'invalid': 0}
+        for result in results:
+            if result['status'] is None:
+                result['status'] = outcomes[result['id']]
+            counts[result['status']] += 1
+        
+        return {
+            'success': counts['invalid'] == 0 and counts['not_found'] == 0,
+            **counts,
+            'results': results
+        }
+    
+    @staticmethod
+    def _sync_delta(update: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Validate one sync update and convert it to a repository delta."""
+        if not isinstance(update, dict):
+            return None, 'Each update must be an object'
+        product_id = update.get('id')
+        if not isinstance(product_id, int) or isinstance(product_id, bool) or product_id <= 0:
+            return None, 'id must be a positive integer'
+        if not any(update.get(field) is not None for field in ('price', 'stock', 'is_active')):
+            return None, 'At least one of price, stock or is_active is required'
+        
+        delta = {'id': product_id, 'price': None, 'stock': None, 'is_active': None}
+        price = update.get('price')
+        if price is not None:
+            if isinstance(price, bool) or not isinstance(price, (int, float, str)):
+                return None, 'Price must be a valid number'
+            try:
+                price = Decimal(str(price))
+            except ArithmeticError:
+                return None, 'Price must be a valid number'
+            if not price.is_finite() or price < 0 or price >= MAX_PRICE:
+                return None, f'Price must be non-negative and less than {MAX_PRICE}'
+            if price != price.quantize(Decimal('0.01')):
+                return None, 'Price must have at most 2 decimal places'
+            delta['price'] = price.quantize(Decimal('0.01'))
+        
+        stock = update.get('stock')
+        if stock is not None:
+            if not isinstance(stock, int) or isinstance(stock, bool) or stock < 0:
+                return None, 'Stock must be a non-negative integer'
+            delta['stock'] = stock
+        
+        is_active = update.get('is_active')
+        if is_active is not None:
+            if not isinstance(is_active, bool):
+                return None, 'is_active must be true or false'
+            delta['is_active'] = is_active
+        
+        return delta, None
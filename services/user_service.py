@@ -1,7 +1,7 @@
 from repositories.user_repository import UserRepository
-import jwt
+from utils.passwords import PasswordHasherBusy
+from utils.tokens import token_manager
 import datetime
-from flask import current_app
 
 class UserService:
     """Service layer for user business logic."""
@@ -21,9 +21,23 @@ class UserService:
         """User login."""
         user = self.user_repository.get_user_by_username(user_data['username'])
         if user and user.check_password(user_data['password']):
-            token = jwt.encode({
-                'user_id': user.id,
-                'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
-            }, current_app.config['SECRET_KEY'])
+            if user.password_needs_rehash():
+                # The cost factor changed since this hash was made; upgrade it now
+                # that the plain password is at hand, but never fail the login for it
+                try:
+                    self.user_repository.update_password(user, user_data['password'])
+                except PasswordHasherBusy:
+                    pass
+            token = token_manager.issue({'user_id': user.id}, datetime.timedelta(hours=1))
             return {'success': True, 'token': token, 'user': {"id": user.id, "name": user.username,"email": user.username}}
         return {'success': False, 'message': 'Invalid credentials'}
+
+    def is_admin(self, user_id) -> bool:
+        """Whether an authenticated user may change the catalog.
+
+        Checked against the database on every call, so revoking the flag takes
+        effect before the user's token expires.
+        """
+        if user_id is None:
+            return False
+        return self.user_repository.is_admin(user_id)
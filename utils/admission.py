@@ -0,0 +1,75 @@
+from typing import Any, Dict, Optional
+import threading
+from flask import g, jsonify, request
+
+# Endpoints that never touch the database and must answer under load
+EXEMPT_ENDPOINTS = {'health_check', 'metrics', 'index', 'static'}
+
+
+class AdmissionController:
+    """Caps how many requests per process may hold a database connection at once.
+
+    The limit defaults to the connection pool's capacity, so a request is
+    either admitted with a connection guaranteed to be free or shed after a
+    short wait, instead of queueing for `pool_timeout` and tying up a worker
+    thread. A limit of 0 disables admission control.
+    """
+
+    def __init__(self, limit: int = 0, wait: float = 0.1):
+        self.limit = limit
+        self.wait = wait
+        self._semaphore = threading.BoundedSemaphore(limit) if limit > 0 else None
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.shed = 0
+
+    def configure(self, limit: Optional[int] = None, wait: Optional[float] = None) -> None:
+        """Change the concurrency limit or how long a request may wait for a slot."""
+        if limit is not None:
+            self.limit = limit
+        if wait is not None:
+            self.wait = wait
+        self._semaphore = threading.BoundedSemaphore(self.limit) if self.limit > 0 else None
+
+    def try_enter(self) -> Optional[threading.BoundedSemaphore]:
+        """Take a slot; returns the semaphore to release, or None when shed."""
+        semaphore = self._semaphore
+        if semaphore is None:
+            return None
+        admitted = semaphore.acquire(timeout=self.wait)
+        with self._lock:
+            if admitted:
+                self.admitted += 1
+            else:
+                self.shed += 1
+        return semaphore if admitted else None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the limit and admission counters."""
+        with self._lock:
+            return {'limit': self.limit, 'wait_s': self.wait,
+                    'admitted': self.admitted, 'shed': self.shed}
+
+
+# Process-wide controller; sized from the DB pool / ADMISSION_* in create_app
+admission_controller = AdmissionController()
+
+
+def admit_request():
+    """before_request hook: shed the request with 503 when no connection slot frees up in time."""
+    if admission_controller.limit <= 0 or request.endpoint in EXEMPT_ENDPOINTS:
+        return None
+    slot = admission_controller.try_enter()
+    if slot is None:
+        response = jsonify({'success': False, 'message': 'Server is busy, please retry shortly'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    g.admission_slot = slot
+    return None
+
+
+def release_request(error=None):
+    """teardown_request hook: give back the slot taken by `admit_request`."""
+    slot = g.pop('admission_slot', None)
+    if slot is not None:
+        slot.release()
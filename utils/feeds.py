@@ -0,0 +1,65 @@
+from typing import IO, Any, Dict, Iterator, Optional, Tuple
+import csv
+import json
+
+FEED_FORMATS = ('ndjson', 'csv')
+
+# (line number, parsed record or None, parse error or None)
+FeedRecord = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def feed_format(name: Optional[str]) -> Optional[str]:
+    """Map a format name, MIME type or file extension to 'ndjson' or 'csv'."""
+    if not name:
+        return None
+    name = name.lower().split(';')[0].strip().rsplit('.', 1)[-1].rsplit('/', 1)[-1]
+    if name in ('ndjson', 'jsonl', 'x-ndjson', 'x-jsonlines', 'jsonlines'):
+        return 'ndjson'
+    if name == 'csv':
+        return 'csv'
+    return None
+
+
+def read_ndjson(stream: IO[str]) -> Iterator[FeedRecord]:
+    """Yield one record per non-blank line of a newline-delimited JSON stream.
+
+    Lines are read one at a time, so memory does not grow with the feed.
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, 'Each line must be a JSON object'
+            continue
+        yield line_number, record, None
+
+
+def read_csv(stream: IO[str]) -> Iterator[FeedRecord]:
+    """Yield one record per data row of a CSV stream with a header row.
+
+    Line numbers are those of the row's last physical line, so they match
+    what an editor shows even with quoted multi-line fields.
+    """
+    reader = csv.DictReader(stream)
+    try:
+        for row in reader:
+            if None in row or None in row.values():
+                yield reader.line_num, None, 'Row does not have the same number of columns as the header'
+                continue
+            yield reader.line_num, {key.strip(): value for key, value in row.items()}, None
+    except csv.Error as e:
+        yield reader.line_num, None, f'Invalid CSV: {e}'
+
+
+def read_feed(stream: IO[str], feed_type: str) -> Iterator[FeedRecord]:
+    """Read a product feed in one of FEED_FORMATS."""
+    if feed_type == 'csv':
+        return read_csv(stream)
+    if feed_type == 'ndjson':
+        return read_ndjson(stream)
+    raise ValueError(f'Unsupported feed format: {feed_type}')
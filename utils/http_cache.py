@@ -0,0 +1,44 @@
+from typing import Any, Optional
+from datetime import datetime, timezone
+import hashlib
+from flask import current_app, request
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a strong ETag value from the repr of the given version parts."""
+    digest = hashlib.sha1(repr(parts).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None):
+    """Return a 304 response if the request's validators match, else None.
+
+    `If-None-Match` takes precedence; `If-Modified-Since` is only consulted
+    when the client sent no ETag, as RFC 9110 requires.
+    """
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif last_modified is not None and request.if_modified_since is not None:
+        matched = _as_utc(last_modified).replace(microsecond=0) <= request.if_modified_since
+    else:
+        matched = False
+
+    if not matched:
+        return None
+    response = current_app.response_class(status=304)
+    return with_validators(response, etag, last_modified)
+
+
+def with_validators(response, etag: str, last_modified: Optional[datetime] = None):
+    """Attach ETag and Last-Modified headers to a successful response."""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _as_utc(last_modified)
+    return response
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Timestamps are stored as naive UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
@@ -0,0 +1,144 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+import functools
+import logging
+import time
+from flask import Flask, g, has_app_context, request
+from sqlalchemy import event
+
+slow_request_logger = logging.getLogger('ecommerce.slow_requests')
+
+# Statements kept per request for the slow-request log
+MAX_RECORDED_STATEMENTS = 100
+
+
+class RequestMetrics:
+    """Timings collected while one request is handled."""
+    __slots__ = ('started', 'sql_count', 'sql_time', 'statements', 'phases')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.statements: List[Tuple[float, str]] = []
+        self.phases: Dict[str, float] = {}
+
+
+def current_metrics() -> Optional[RequestMetrics]:
+    """Metrics of the request being handled, or None outside a timed request."""
+    if not has_app_context():
+        return None
+    return g.get('request_metrics')
+
+
+def record_phase(name: str, seconds: float) -> None:
+    """Add time spent in a named phase (e.g. 'serialize', 'hash') to the current request."""
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.phases[name] = metrics.phases.get(name, 0.0) + seconds
+
+
+@contextmanager
+def timed_phase(name: str) -> Iterator[None]:
+    """Record the time spent in a block as phase `name` of the current request.
+
+    SQL and phases recorded inside the block are left out, so every
+    Server-Timing entry covers its own time and they add up to the total.
+    """
+    metrics = current_metrics()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    sql_before = metrics.sql_time
+    nested_before = sum(metrics.phases.values())
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        nested = sum(metrics.phases.values()) - nested_before
+        record_phase(name, elapsed - (metrics.sql_time - sql_before) - nested)
+
+
+class TimedService:
+    """Proxy that records every method call on a service as the 'service' phase.
+
+    Controllers wrap their service instances in it, so Server-Timing separates
+    business logic from SQL, serialization and the controller itself.
+    """
+
+    def __init__(self, service: Any):
+        self._service = service
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._service, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            with timed_phase('service'):
+                return attribute(*args, **kwargs)
+
+        # Cached so later lookups skip __getattr__
+        setattr(self, name, timed)
+        return timed
+
+
+def instrument_engine(engine) -> None:
+    """Count and time every statement the engine runs on behalf of a request."""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        metrics = current_metrics()
+        if metrics is None:
+            return
+        metrics.sql_count += 1
+        metrics.sql_time += elapsed
+        if len(metrics.statements) < MAX_RECORDED_STATEMENTS:
+            metrics.statements.append((elapsed, statement))
+
+    @event.listens_for(engine, 'handle_error')
+    def _failed(context):
+        # after_cursor_execute does not run for a failed statement
+        started = context.connection.info.get('query_started') if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+def init_request_timing(app: Flask, slow_request_ms: float) -> None:
+    """Register the hooks that time each request and emit Server-Timing."""
+
+    @app.before_request
+    def _start_timing():
+        g.request_metrics = RequestMetrics()
+
+    @app.after_request
+    def _finish_timing(response):
+        metrics = g.pop('request_metrics', None)
+        if metrics is None:
+            return response
+        total = time.perf_counter() - metrics.started
+        other = total - metrics.sql_time - sum(metrics.phases.values())
+
+        entries = [f'sql;dur={metrics.sql_time * 1000:.2f};desc="{metrics.sql_count} queries"']
+        entries.extend(f'{name};dur={seconds * 1000:.2f}' for name, seconds in metrics.phases.items())
+        entries.append(f'app;dur={max(other, 0.0) * 1000:.2f}')
+        entries.append(f'total;dur={total * 1000:.2f}')
+        response.headers['Server-Timing'] = ', '.join(entries)
+
+        if total * 1000 >= slow_request_ms:
+            slow_request_logger.warning(
+                'Slow request %s %s -> %s in %.1f ms (sql: %d queries, %.1f ms; %s)\n%s',
+                request.method, request.full_path.rstrip('?'), response.status_code, total * 1000,
+                metrics.sql_count, metrics.sql_time * 1000,
+                ', '.join(f'{name}: {seconds * 1000:.1f} ms' for name, seconds in metrics.phases.items()) or 'no phases',
+                '\n'.join(f'  {elapsed * 1000:8.2f} ms  {" ".join(statement.split())}'
+                          for elapsed, statement in metrics.statements)
+            )
+        return response
@@ -0,0 +1,105 @@
+from typing import Any, Callable, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import time
+from utils.instrumentation import record_phase
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when every hashing slot is taken; callers should answer 503."""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool with a bounded backlog.
+
+    At most `workers` hashes run at once (bcrypt releases the GIL, so request
+    threads serving other endpoints keep running) and at most `queue_size`
+    more wait for a worker. Beyond that, `hash` and `verify` raise
+    PasswordHasherBusy immediately instead of queueing.
+    """
+
+    def __init__(self, rounds: int = 12, workers: int = 2, queue_size: int = 16):
+        self.rounds = rounds
+        self.workers = workers
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self.completed = 0
+        self.rejected = 0
+
+    def configure(self, rounds: Optional[int] = None, workers: Optional[int] = None,
+                  queue_size: Optional[int] = None) -> None:
+        """Change the cost factor or pool bounds; the pool is rebuilt on next use."""
+        with self._lock:
+            if rounds is not None:
+                self.rounds = rounds
+            if workers is not None:
+                self.workers = workers
+            if queue_size is not None:
+                self.queue_size = queue_size
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+            self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the configured cost factor."""
+        rounds = self.rounds
+
+        def work():
+            import bcrypt  # deferred: only needed by auth endpoints, slow to import
+            return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+        return self._run(work)
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        """Check a password against a stored hash."""
+        def work():
+            import bcrypt
+            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        return self._run(work)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Whether a stored hash was made with a different cost factor."""
+        # Modular crypt format: $2b$<rounds>$<salt+hash>
+        parts = password_hash.split('$')
+        return len(parts) < 4 or not parts[2].isdigit() or int(parts[2]) != self.rounds
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pool bounds and counters."""
+        return {'rounds': self.rounds, 'workers': self.workers, 'queue_size': self.queue_size,
+                'completed': self.completed, 'rejected': self.rejected}
+
+    def _run(self, work: Callable[[], Any]) -> Any:
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy('Password hashing capacity exhausted')
+        try:
+            future = self._get_executor().submit(work)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        started = time.perf_counter()
+        result = future.result()
+        record_phase('hash', time.perf_counter() - started)
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            # Pool threads do not survive fork; a forked worker builds its own
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='password-hasher')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+
+# Process-wide hasher; sized from BCRYPT_ROUNDS / PASSWORD_HASH_* in create_app
+password_hasher = PasswordHasher()
@@ -0,0 +1,153 @@
+from typing import Callable, Dict, Mapping, Optional, Tuple
+from functools import wraps
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from flask import g, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+# Route class -> (burst capacity, seconds to refill it completely)
+DEFAULT_LIMITS: Dict[str, Tuple[int, float]] = {
+    'search': (120, 60.0),
+    'validate': (60, 60.0),
+    'auth': (10, 60.0),
+    'export': (10, 60.0),
+}
+
+# One statement refills the bucket for the elapsed time and takes a token if
+# one is available, so concurrent workers cannot both spend the last token
+_TAKE_TOKEN = """
+INSERT INTO bucket (key, tokens, updated, allowed) VALUES (:key, :capacity - 1, :now, 1)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = CASE WHEN MIN(:capacity, tokens + (:now - updated) * :rate) >= 1
+                  THEN MIN(:capacity, tokens + (:now - updated) * :rate) - 1
+                  ELSE MIN(:capacity, tokens + (:now - updated) * :rate) END,
+    allowed = MIN(:capacity, tokens + (:now - updated) * :rate) >= 1,
+    updated = :now
+RETURNING tokens, allowed
+"""
+
+
+def parse_limits(value: Optional[str]) -> Dict[str, Tuple[int, float]]:
+    """Parse RATE_LIMITS ("search=120/60,auth=10/60") over the defaults."""
+    limits = dict(DEFAULT_LIMITS)
+    for entry in (value or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        route_class, _, spec = entry.partition('=')
+        capacity, _, period = spec.partition('/')
+        try:
+            limits[route_class.strip()] = (int(capacity), float(period))
+        except ValueError:
+            raise ValueError('RATE_LIMITS entries must look like name=requests/seconds') from None
+    return limits
+
+
+class RateLimiter:
+    """Token buckets per (route class, client) shared by every worker on the host.
+
+    Buckets live in a small SQLite file (WAL, no fsync), so Gunicorn workers
+    and threads draw from the same counters. If the store cannot be reached
+    requests are let through: the limiter must never take the API down.
+    """
+
+    def __init__(self, limits: Optional[Mapping[str, Tuple[int, float]]] = None,
+                 path: Optional[str] = None, enabled: bool = True):
+        self.limits = dict(limits or DEFAULT_LIMITS)
+        self.path = path or os.path.join(tempfile.gettempdir(), 'ecommerce-rate-limit.sqlite3')
+        self.enabled = enabled
+        self._local = threading.local()
+        self._calls = 0
+
+    def configure(self, limits: Optional[Mapping[str, Tuple[int, float]]] = None,
+                  path: Optional[str] = None, enabled: Optional[bool] = None) -> None:
+        """Change limits, store location or on/off state."""
+        if limits is not None:
+            self.limits = dict(limits)
+        if path is not None:
+            self.path = path
+        if enabled is not None:
+            self.enabled = enabled
+        self._local = threading.local()
+
+    def hit(self, route_class: str, client: str) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until a token is available)."""
+        limit = self.limits.get(route_class)
+        if not self.enabled or limit is None:
+            return True, 0.0
+        capacity, period = limit
+        rate = capacity / period
+        try:
+            connection = self._connection()
+            # fetchall() steps the statement to completion so its write lock is released
+            (tokens, allowed), = connection.execute(_TAKE_TOKEN, {
+                'key': f'{route_class}:{client}', 'capacity': capacity,
+                'rate': rate, 'now': time.time()
+            }).fetchall()
+            self._calls += 1
+            if self._calls % 1000 == 0:
+                self._prune(connection)
+        except sqlite3.Error:
+            logger.warning('Rate limit store unavailable; allowing request', exc_info=True)
+            return True, 0.0
+        if allowed:
+            return True, 0.0
+        return False, (1 - tokens) / rate
+
+    def _prune(self, connection: sqlite3.Connection) -> None:
+        # A bucket idle for longer than the slowest refill is full again
+        longest = max((period for _, period in self.limits.values()), default=0)
+        connection.execute('DELETE FROM bucket WHERE updated < ?', (time.time() - longest,))
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread and process (connections must not cross a fork)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            # Autocommit: every statement is its own atomic transaction
+            connection = sqlite3.connect(self.path, timeout=0.5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute('CREATE TABLE IF NOT EXISTS bucket ('
+                               'key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                               'updated REAL NOT NULL, allowed INTEGER NOT NULL)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+
+# Process-wide limiter; configured from RATE_LIMIT_* in create_app
+rate_limiter = RateLimiter()
+
+
+def client_key() -> str:
+    """Identify the caller: the authenticated user, else the remote address."""
+    user_id = getattr(g, 'current_user_id', None)
+    if user_id is not None:
+        return f'user:{user_id}'
+    return f'ip:{request.remote_addr}'
+
+
+def rate_limited(route_class: str, when: Optional[Callable[[], bool]] = None):
+    """Decorator that answers 429 with Retry-After once the client's bucket is empty.
+
+    With `when`, only requests for which it returns True are counted.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if when is not None and not when():
+                return view(*args, **kwargs)
+            allowed, retry_after = rate_limiter.hit(route_class, client_key())
+            if not allowed:
+                response = jsonify({'success': False, 'message': 'Too many requests, please retry later'})
+                response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                return response, 429
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,193 @@
+from typing import Any, Callable, Iterable, Iterator, List
+from decimal import Decimal
+import json
+import os
+import time
+from flask.json.provider import DefaultJSONProvider
+from utils.cache import LRUCache
+from utils.instrumentation import record_phase
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class JSONFragment:
+    """Already-encoded JSON that is written into responses verbatim."""
+    __slots__ = ('raw',)
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+
+
+def _default(obj: Any) -> Any:
+    # Decimals go out as numbers; everything else (dates, UUIDs, dataclasses,
+    # Markup) is encoded the way Flask's own provider does it
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return DefaultJSONProvider.default(obj)
+
+
+# orjson would write datetimes and dataclasses itself (dates as ISO 8601);
+# hand them to _default so both backends produce the same output
+_ORJSON_OPTIONS = 0
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+def _orjson_dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _select_backend(name: str) -> Callable[[Any], bytes]:
+    if name == 'orjson' or (name == 'auto' and orjson is not None):
+        if orjson is None:
+            raise RuntimeError('JSON_ENCODER=orjson requires the orjson package')
+        return _orjson_dumps
+    return _stdlib_dumps
+
+
+# Leaf encoder; JSON_ENCODER selects 'orjson', 'json' or 'auto' (orjson if installed)
+_backend_dumps = _select_backend(os.environ.get('JSON_ENCODER', 'auto'))
+
+_NESTED = (dict, list, tuple, JSONFragment)
+_SCALAR_KEYS = (bool, int, float, type(None))
+
+
+def _encode_key(key: Any) -> bytes:
+    # Same key forms the backends write for flat dicts: true, null, 1, 1.5
+    if isinstance(key, str):
+        return _backend_dumps(key)
+    if isinstance(key, _SCALAR_KEYS):
+        return _backend_dumps(_backend_dumps(key).decode('utf-8'))
+    raise TypeError(f'keys must be str, int, float, bool or None, not {type(key).__name__}')
+
+
+def _encode(obj: Any, out: List[bytes]) -> None:
+    if isinstance(obj, JSONFragment):
+        out.append(obj.raw)
+    elif isinstance(obj, dict):
+        # Containers without nested values go to the backend in one call
+        if not any(isinstance(value, _NESTED) for value in obj.values()):
+            out.append(_backend_dumps(obj))
+            return
+        out.append(b'{')
+        for index, (key, value) in enumerate(obj.items()):
+            if index:
+                out.append(b',')
+            out.append(_encode_key(key))
+            out.append(b':')
+            _encode(value, out)
+        out.append(b'}')
+    elif isinstance(obj, (list, tuple)):
+        if not any(isinstance(value, _NESTED) for value in obj):
+            out.append(_backend_dumps(obj))
+            return
+        out.append(b'[')
+        for index, value in enumerate(obj):
+            if index:
+                out.append(b',')
+            _encode(value, out)
+        out.append(b']')
+    else:
+        out.append(_backend_dumps(obj))
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode `obj` as JSON bytes, splicing in any JSONFragment values."""
+    out: List[bytes] = []
+    _encode(obj, out)
+    return b''.join(out)
+
+
+# Bytes buffered before a streamed response yields a chunk
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(items: Iterable[Any], prefix: bytes = b'[',
+                    suffix: Callable[[int], bytes] = lambda count: b']') -> Iterator[bytes]:
+    """Encode `items` as a JSON array, yielding about STREAM_CHUNK_SIZE bytes at a time.
+
+    `prefix` and `suffix` wrap the array, e.g. to put it inside an envelope;
+    `suffix` receives the number of items written.
+    """
+    out: List[bytes] = [prefix]
+    size = len(prefix)
+    count = 0
+    for item in items:
+        if count:
+            out.append(b',')
+        position = len(out)
+        _encode(item, out)
+        size += sum(len(part) for part in out[position:])
+        count += 1
+        if size >= STREAM_CHUNK_SIZE:
+            yield b''.join(out)
+            out.clear()
+            size = 0
+    out.append(suffix(count))
+    yield b''.join(out)
+
+
+def iter_json_lines(items: Iterable[Any]) -> Iterator[bytes]:
+    """Encode `items` as newline-delimited JSON, yielding about STREAM_CHUNK_SIZE bytes at a time."""
+    out: List[bytes] = []
+    size = 0
+    for item in items:
+        position = len(out)
+        _encode(item, out)
+        out.append(b'\n')
+        size += sum(len(part) for part in out[position:])
+        if size >= STREAM_CHUNK_SIZE:
+            yield b''.join(out)
+            out.clear()
+            size = 0
+    if out:
+        yield b''.join(out)
+
+
+# Encoded product JSON keyed by (id, version); a new row version is a new key,
+# so this per-process cache never needs invalidating across workers
+product_fragments = LRUCache(max_size=10000, ttl=3600)
+
+
+def product_fragment(product) -> JSONFragment:
+    """Get the encoded JSON of a product, reusing the cached fragment for its version."""
+    key = (product.id, product.version)
+    fragment = product_fragments.get(key)
+    if fragment is None:
+        fragment = JSONFragment(_backend_dumps(product.to_dict()))
+        product_fragments.set(key, fragment)
+    return fragment
+
+
+class FragmentJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that uses the fast encoder and understands JSONFragment."""
+
+    # What the fast encoder does; also applied when dumps falls back to the stdlib
+    sort_keys = False
+    ensure_ascii = False
+
+    @staticmethod
+    def default(obj: Any) -> Any:
+        if isinstance(obj, JSONFragment):
+            return json.loads(obj.raw)
+        return _default(obj)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # Options such as sort_keys, indent or separators need the stdlib encoder
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode('utf-8')
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        started = time.perf_counter()
+        body = dumps(obj)
+        record_phase('serialize', time.perf_counter() - started)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,123 @@
+from typing import Any, Dict, List, Optional, Tuple
+import datetime
+import time
+from flask import g, jsonify, request
+from utils.cache import LRUCache
+
+ALGORITHM = 'HS256'
+
+
+class InvalidToken(Exception):
+    """Raised for bearer tokens that are malformed, expired or badly signed."""
+
+
+def parse_keys(value: Optional[str], fallback_secret: str) -> List[Tuple[str, str]]:
+    """Parse JWT_KEYS ("kid:secret,kid:secret", signing key first) into (kid, secret) pairs."""
+    keys = []
+    for entry in (value or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        kid, separator, secret = entry.partition(':')
+        if not separator or not kid or not secret:
+            raise ValueError('JWT_KEYS entries must look like kid:secret')
+        keys.append((kid, secret))
+    return keys or [('default', fallback_secret)]
+
+
+class TokenManager:
+    """Issues and verifies HS256 bearer tokens with rotating keys.
+
+    Tokens are signed with the first key and carry its `kid` header; any
+    configured key verifies, so a new key can be put first while tokens
+    signed with the previous one stay valid until it is removed. Tokens
+    without a `kid` (issued before rotation support) are checked against
+    every key.
+
+    Verified tokens are cached until their `exp` (capped by the cache TTL),
+    so repeat requests skip the HMAC and JSON decoding.
+    """
+
+    def __init__(self, keys: Optional[List[Tuple[str, str]]] = None, cache_size: int = 10000,
+                 cache_ttl: float = 300.0):
+        self.keys: Dict[str, str] = dict(keys or [])
+        self.signing_kid: Optional[str] = keys[0][0] if keys else None
+        self.cache = LRUCache(max_size=cache_size, ttl=cache_ttl)
+
+    def configure(self, keys: Optional[List[Tuple[str, str]]] = None, cache_size: Optional[int] = None,
+                  cache_ttl: Optional[float] = None) -> None:
+        """Replace the key set or cache bounds; previously verified tokens are forgotten."""
+        if keys is not None:
+            self.keys = dict(keys)
+            self.signing_kid = keys[0][0]
+        self.cache.configure(max_size=cache_size, ttl=cache_ttl)
+
+    def issue(self, claims: Dict[str, Any], expires_in: datetime.timedelta) -> str:
+        """Sign a token with the current key."""
+        import jwt  # deferred: keeps worker startup free of crypto imports
+        payload = dict(claims, exp=datetime.datetime.utcnow() + expires_in)
+        return jwt.encode(payload, self.keys[self.signing_kid], algorithm=ALGORITHM,
+                          headers={'kid': self.signing_kid})
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Return the claims of a valid token or raise InvalidToken."""
+        claims = self.cache.get(token)
+        if claims is not None:
+            return claims
+
+        claims = self._decode(token)
+        remaining = claims['exp'] - time.time()
+        if remaining > 0:
+            self.cache.set(token, claims, ttl=min(remaining, self.cache.ttl))
+        return claims
+
+    def _decode(self, token: str) -> Dict[str, Any]:
+        import jwt
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as e:
+            raise InvalidToken(str(e)) from e
+        if kid is not None and kid not in self.keys:
+            raise InvalidToken('Unknown signing key')
+        secrets = [self.keys[kid]] if kid is not None else list(self.keys.values())
+
+        error: Optional[Exception] = None
+        for secret in secrets:
+            try:
+                return jwt.decode(token, secret, algorithms=[ALGORITHM], options={'require': ['exp']})
+            except jwt.InvalidSignatureError as e:
+                error = e
+            except jwt.InvalidTokenError as e:
+                raise InvalidToken(str(e)) from e
+        raise InvalidToken(str(error))
+
+
+# Process-wide token manager; keys come from JWT_KEYS / SECRET_KEY in create_app
+token_manager = TokenManager()
+
+
+def authenticate_request():
+    """before_request hook: verify an `Authorization: Bearer` token if one is sent.
+
+    Sets `g.current_user_id` (None for anonymous requests); a token that
+    does not verify is rejected with 401 rather than treated as anonymous.
+    """
+    g.current_user_id = None
+    header = request.headers.get('Authorization')
+    if not header:
+        return None
+    scheme, _, token = header.partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return _unauthorized('Authorization header must be "Bearer <token>"')
+    try:
+        claims = token_manager.verify(token.strip())
+    except InvalidToken:
+        return _unauthorized('Invalid or expired token')
+    g.current_user_id = claims.get('user_id')
+    return None
+
+
+def _unauthorized(message: str):
+    response = jsonify({'success': False, 'message': message})
+    response.headers['WWW-Authenticate'] = 'Bearer'
+    return response, 401
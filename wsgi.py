@@ -0,0 +1,8 @@
+"""WSGI entry point for production servers, e.g. `gunicorn -c gunicorn.conf.py wsgi:app`."""
+import os
+
+os.environ.setdefault('SERVER_MODE', 'production')
+
+from app import create_app
+
+app = create_app()